@@ -3,6 +3,7 @@ from flask import Flask
 from applications.api.analysis import analysis_api
 from applications.api.file import file_api
 from applications.api.history import history_api
+from applications.api.metrics import metrics_api
 from applications.api.model import model_api
 
 
@@ -11,4 +12,5 @@ def system_api(app: Flask):
     app.register_blueprint(history_api)
     app.register_blueprint(analysis_api)
     app.register_blueprint(model_api)
+    app.register_blueprint(metrics_api)
     pass
@@ -2,8 +2,9 @@ import json
 import os
 
 import cv2
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request, send_file
 from sqlalchemy import desc
+from sqlalchemy.orm import defer
 
 from applications.common.curd import model_to_dicts
 from applications.common.path_global import up_dir, generate_dir, fun_type_1, fun_type_4, fun_type_5, fun_type_3, \
@@ -12,35 +13,124 @@ from applications.common.utils import type_utils
 from applications.common.utils.http import fail_api, success_api, table_api
 from applications.common.utils.type_utils import items_handle
 from applications.common.utils.upload import img_url_handle
-from applications.extensions import db
-from applications.image_processing import histogram_match
+from applications.api.history import analysis_handle
+from applications.extensions import db, jobs, model_registry, response_cache, profiler
+from applications.extensions.job_queue import Job, JobQueueFull
 from applications.interface.analysis import change_detection, object_detection, terrain_classification, hole_handle, \
-    handle, classification, image_restoration
+    cached_handle, classification, image_restoration, tiled_change_detection, PROGRESS_STAGES
 from applications.interface.compute_variation import compute_variation
 from applications.interface.draw_mask import draw_masks
-from applications.interface.utils import get_model_info
 from applications.models.analysis import Analysis
-from applications.schemas import AnalysisSchema
+from applications.schemas import AnalysisSchema, AnalysisSummarySchema
 
 analysis_api = Blueprint('analysis_api', __name__, url_prefix='/api/analysis')
+
+
+def check_model(model_path, model_type):
+    """
+    校验模型类型，通过时返回None，否则返回错误响应
+    """
+    try:
+        if model_registry.model_type(model_path) != model_type:
+            return fail_api("模型类型不正确，请检查")
+    except:
+        return fail_api("模型不存在，请检查")
+    return None
+
+
+def submit_job(name, func, *args, total=0):
+    """
+    将分析流程提交到任务队列，默认立即返回任务信息，请求中wait为真时等待任务结束，
+    等待超过JOB_WAIT_TIMEOUT秒时返回202与任务信息，由客户端轮询/api/analysis/job/<job_id>
+    :param total: 图片数，乘以流程的阶段数PROGRESS_STAGES作为任务进度的总数
+    """
+    # 请求头X-Profile: 1或参数profile=1时对本次任务进行性能分析
+    profile = request.headers.get("X-Profile") == "1" or request.args.get(
+        "profile") == "1"
+    try:
+        job = jobs.submit(
+            name,
+            func,
+            *args,
+            total=total * PROGRESS_STAGES.get(func, 1),
+            profile=profile)
+    except JobQueueFull:
+        return fail_api("任务队列已满，请稍后再试")
+    if request.json.get("wait"):
+        if not job.wait(current_app.config.get("JOB_WAIT_TIMEOUT", 30)):
+            return success_api(msg="任务执行中", data=job.to_dict()), 202
+        if job.status == Job.FAILED:
+            return fail_api("后端出现异常：{}".format(job.error))
+    return success_api(data=job.to_dict())
+
+
+"""
+    任务状态
+"""
+
+
+@analysis_api.get('/job/<string:job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return fail_api("任务不存在")
+    return success_api(data=job.to_dict())
+
+
+@analysis_api.get('/jobs')
+def job_list():
+    return success_api(data=[job.to_dict() for job in jobs.list()])
+
+
+@analysis_api.get('/job/<string:job_id>/profile/<string:kind>')
+def job_profile(job_id, kind):
+    """
+    下载任务的性能分析结果
+    :param kind: stats为cProfile统计文件(pstats格式)，collapsed为折叠栈文件(用于生成火焰图)
+    """
+    job = jobs.get(job_id)
+    if job is None or not job.profile:
+        return fail_api("任务不存在或未开启性能分析")
+    if kind not in ("stats", "collapsed"):
+        return fail_api("请求参数异常")
+    path = profiler.path(job.id, kind)
+    if not job.finished or not os.path.isfile(path):
+        return fail_api("性能分析尚未完成")
+    return send_file(
+        os.path.abspath(path),
+        as_attachment=True,
+        download_name=os.path.basename(path))
+
+
 """
     结果展示
 """
 
 
 @analysis_api.get('/show/<string:type>')
+@response_cache.cached
 def show_result(type):
     # orm查询
     # 使用分页获取data需要.items
+    # view=summary时只返回摘要，详细结果通过/api/history/<id>获取
+    summary = request.args.get('view') == 'summary'
+    schema = AnalysisSummarySchema if summary else AnalysisSchema
     to_type = type_utils.str_to_type(type)
-    log = Analysis.query.filter_by(
-        type=to_type).order_by(desc(Analysis.create_time)).layui_paginate()
-    log_items = log.items
-    items_handle(log_items)
-    count = log.total
-    return table_api(
-        data=model_to_dicts(
-            schema=AnalysisSchema, data=log_items), count=count)
+    query = Analysis.query
+    if summary:
+        query = query.options(defer(Analysis.data))
+    log_items, count, next_cursor = query.filter_by(
+        type=to_type).order_by(
+            desc(Analysis.create_time), desc(Analysis.id)).table_paginate(
+                Analysis.create_time,
+                Analysis.id,
+                count_ttl=current_app.config.get("PAGINATE_COUNT_TTL", 0))
+    if not summary:
+        analysis_handle(log_items)
+    # 序列化后再转换功能类型名称，与历史记录列表一致
+    dicts = model_to_dicts(schema=schema, data=log_items)
+    items_handle(dicts)
+    return table_api(data=dicts, count=count, next_cursor=next_cursor)
 
 
 """
@@ -58,12 +148,9 @@ def change_detection_api():
         return fail_api("步长和窗口大小必须大于0")
     if window_size < stride:
         return fail_api("步长必须小于等于窗口大小")
-    try:
-        model_info = get_model_info(model_path)
-        if model_info["_Attributes"]["model_type"] != "change_detector":
-            return fail_api("模型类型不正确，请检查")
-    except:
-        return fail_api("模型不存在，请检查")
+    error = check_model(model_path, "change_detector")
+    if error:
+        return error
     list_ = req_json["list"]
     step1_ = req_json["prehandle"]
     step2_ = req_json["denoise"]
@@ -80,9 +167,34 @@ def change_detection_api():
             return fail_api("请求参数异常")
     print("----------------->change_detection" + json.dumps(req_json))
     type_ = 1
-    change_detection(model_path, up_dir, generate_dir, list_, step1_, step2_,
-                     type_, window_size, stride)
-    return success_api()
+    if req_json.get("tiled"):
+        # 分块模式直接读取原始影像，不支持预处理
+        if step1_ != 0 or step2_ != 0:
+            return fail_api("分块模式不支持预处理和去噪")
+        return submit_job(
+            "change_detection",
+            tiled_change_detection,
+            model_path,
+            up_dir,
+            generate_dir,
+            list_,
+            type_,
+            window_size,
+            stride,
+            total=len(list_))
+    return submit_job(
+        "change_detection",
+        change_detection,
+        model_path,
+        up_dir,
+        generate_dir,
+        list_,
+        step1_,
+        step2_,
+        type_,
+        window_size,
+        stride,
+        total=len(list_))
 
 
 """
@@ -94,12 +206,9 @@ def change_detection_api():
 def object_detection_api():
     req_json = request.json
     model_path = req_json["model_path"]
-    try:
-        model_info = get_model_info(model_path)
-        if model_info["_Attributes"]["model_type"] != "detector":
-            return fail_api("模型类型不正确，请检查")
-    except:
-        return fail_api("模型不存在，请检查")
+    error = check_model(model_path, "detector")
+    if error:
+        return error
     list_ = req_json["list"]
     step1_ = req_json["prehandle"]
     step2_ = req_json["denoise"]
@@ -110,10 +219,17 @@ def object_detection_api():
     if list_ is None:
         return fail_api("请上传图片")
     type_ = 2
-    object_detection(model_path, up_dir, generate_dir, list_, step1_, step2_,
-                     type_)
-
-    return success_api()
+    return submit_job(
+        "object_detection",
+        object_detection,
+        model_path,
+        up_dir,
+        generate_dir,
+        list_,
+        step1_,
+        step2_,
+        type_,
+        total=len(list_))
 
 
 """
@@ -125,12 +241,9 @@ def object_detection_api():
 def semantic_segmentation_api():
     req_json = request.json
     model_path = req_json["model_path"]
-    try:
-        model_info = get_model_info(model_path)
-        if model_info["_Attributes"]["model_type"] != "segmenter":
-            return fail_api("模型类型不正确，请检查")
-    except:
-        return fail_api("模型不存在，请检查")
+    error = check_model(model_path, "segmenter")
+    if error:
+        return error
     list_ = req_json["list"]
     step1_ = req_json["prehandle"]
     step2_ = req_json["denoise"]
@@ -141,9 +254,17 @@ def semantic_segmentation_api():
     if list_ is None:
         return fail_api("请上传图片")
     type_ = 3
-    terrain_classification(model_path, up_dir, generate_dir, list_, step1_,
-                           step2_, type_)
-    return success_api()
+    return submit_job(
+        "semantic_segmentation",
+        terrain_classification,
+        model_path,
+        up_dir,
+        generate_dir,
+        list_,
+        step1_,
+        step2_,
+        type_,
+        total=len(list_))
 
 
 """
@@ -155,18 +276,21 @@ def semantic_segmentation_api():
 def classification_api():
     req_json = request.json
     model_path = req_json["model_path"]
-    try:
-        model_info = get_model_info(model_path)
-        if model_info["_Attributes"]["model_type"] != "classifier":
-            return fail_api("模型类型不正确，请检查")
-    except:
-        return fail_api("模型不存在，请检查")
+    error = check_model(model_path, "classifier")
+    if error:
+        return error
     img_list = req_json["list"]
     if img_list is None:
         return fail_api("请上传图片")
     type_ = 4
-    classification(model_path, up_dir, img_list, type_)
-    return success_api()
+    return submit_job(
+        "classification",
+        classification,
+        model_path,
+        up_dir,
+        img_list,
+        type_,
+        total=len(img_list))
 
 
 """
@@ -178,18 +302,22 @@ def classification_api():
 def image_restoration_api():
     req_json = request.json
     model_path = req_json["model_path"]
-    try:
-        model_info = get_model_info(model_path)
-        if model_info["_Attributes"]["model_type"] != "restorer":
-            return fail_api("模型类型不正确，请检查")
-    except:
-        return fail_api("模型不存在，请检查")
+    error = check_model(model_path, "restorer")
+    if error:
+        return error
     img_list = req_json["list"]
     if img_list is None:
         return fail_api("请上传图片")
     type_ = 5
-    image_restoration(model_path, up_dir, generate_dir, img_list, type_)
-    return success_api()
+    return submit_job(
+        "image_restoration",
+        image_restoration,
+        model_path,
+        up_dir,
+        generate_dir,
+        img_list,
+        type_,
+        total=len(img_list))
 
 
 """
@@ -214,11 +342,13 @@ def pre_handle():
         pair['second'] = img_url_handle(pair['second'])
     match = list()
     if step1_ == fun_type_1:
-        match = histogram_match.gram_match(list_, up_dir, generate_dir)
+        match = cached_handle(fun_type_1, [pair["first"] for pair in list_],
+                              up_dir, [pair["second"] for pair in list_])
+        match = [generate_url + name for name in match]
     else:
         for pair in list_:
             temps = [pair["first"], pair["second"]]
-            imgs1 = handle(fun_type_4, temps, up_dir, generate_dir)
+            imgs1 = cached_handle(fun_type_4, temps, up_dir)
             match.append({
                 "first": generate_url + imgs1[0],
                 "second": generate_url + imgs1[1]
@@ -246,7 +376,7 @@ def image_pre():
             temps = [
                 img_url_handle(pair["first"]), img_url_handle(pair["second"])
             ]
-            imgs1 = handle(fun_type_4, temps, up_dir, generate_dir)
+            imgs1 = cached_handle(fun_type_4, temps, up_dir)
             imgs.append({
                 "first": pair["first"],
                 "first1": imgs1[0],
@@ -257,7 +387,7 @@ def image_pre():
         temps = list()
         for pair in list_:
             temps.append(img_url_handle(pair))
-        imgs = handle(step1_, temps, up_dir, generate_dir)
+        imgs = cached_handle(step1_, temps, up_dir)
         for i, img in enumerate(imgs):
             imgs[i] = generate_url + img
     return success_api(data=imgs)
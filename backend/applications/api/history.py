@@ -1,15 +1,19 @@
 import json
+import os
 
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request
 from sqlalchemy import desc
+from sqlalchemy.orm import defer
 
-from applications.common.curd import model_to_dicts
+from applications.common.curd import model_to_dicts, delete_by_ids
+from applications.common.path_global import generate_dir, generate_url
 from applications.common.utils import type_utils
 from applications.common.utils.http import fail_api, success_api, table_api
 from applications.common.utils.type_utils import items_handle
-from applications.extensions import db
+from applications.extensions import db, jobs, response_cache
+from applications.extensions.init_sqlalchemy import clear_count_cache
 from applications.models.analysis import Analysis
-from applications.schemas import AnalysisSchema
+from applications.schemas import AnalysisSchema, AnalysisSummarySchema
 
 history_api = Blueprint('history_api', __name__, url_prefix='/api/history')
 """
@@ -18,29 +22,48 @@ history_api = Blueprint('history_api', __name__, url_prefix='/api/history')
 
 
 @history_api.get('/list')
+@response_cache.cached
 def history_list():
     # orm查询
     # 使用分页获取data需要.items
+    # 请求参数中有cursor时使用游标分页，第一页传空的cursor
+    # view=summary时只返回摘要，不读取和解析结果数据data
     _type = request.args.get('type', type=str)
-    if _type is None or _type == '""' or _type == "":
-        log = Analysis.query.order_by(desc(
-            Analysis.create_time)).layui_paginate()
-        count = log.total
-        items = log.items
-        analysis_handle(items)
-        dicts = model_to_dicts(schema=AnalysisSchema, data=items)
-        items_handle(dicts)
-        return table_api(data=dicts, count=count)
-    else:
+    summary = request.args.get('view') == 'summary'
+    query = Analysis.query
+    if summary:
+        query = query.options(defer(Analysis.data))
+    if not (_type is None or _type == '""' or _type == ""):
         to_type = type_utils.str_to_type(_type)
-        log = Analysis.query.filter_by(
-            type=to_type).order_by(desc(Analysis.create_time)).layui_paginate()
-        count = log.total
-        items = log.items
+        query = query.filter_by(type=to_type)
+    items, count, next_cursor = query.order_by(
+        desc(Analysis.create_time), desc(Analysis.id)).table_paginate(
+            Analysis.create_time,
+            Analysis.id,
+            count_ttl=current_app.config.get("PAGINATE_COUNT_TTL", 0))
+    if summary:
+        dicts = model_to_dicts(schema=AnalysisSummarySchema, data=items)
+    else:
         analysis_handle(items)
         dicts = model_to_dicts(schema=AnalysisSchema, data=items)
-        items_handle(dicts)
-        return table_api(data=dicts, count=count)
+    items_handle(dicts)
+    return table_api(data=dicts, count=count, next_cursor=next_cursor)
+
+
+"""
+    查询单条记录的详细结果
+"""
+
+
+@history_api.get('/<int:id>')
+def history_detail(id):
+    analysis = Analysis.query.get(id)
+    if analysis is None:
+        return fail_api(msg="记录不存在")
+    analysis_handle([analysis])
+    data = AnalysisSchema().dump(analysis)
+    items_handle([data])
+    return success_api(data=data)
 
 
 def analysis_handle(items):
@@ -55,15 +78,61 @@ def analysis_handle(items):
 批量删除
 """
 
+DELETE_CHUNK_SIZE = 1000
+
+
+def result_files(ids):
+    """
+    查询分析记录生成的结果文件路径，只包含结果目录下的文件，不包含上传的原图
+    """
+    paths = set()
+
+    def collect(value):
+        if isinstance(value, dict):
+            for v in value.values():
+                collect(v)
+        elif isinstance(value, str):
+            if value.startswith(generate_url):
+                paths.add(generate_dir + value[len(generate_url):])
+            elif value.startswith(generate_dir):
+                paths.add(value)
+
+    for i in range(0, len(ids), DELETE_CHUNK_SIZE):
+        rows = db.session.query(Analysis.after_img, Analysis.data).filter(
+            Analysis.id.in_(ids[i:i + DELETE_CHUNK_SIZE])).all()
+        for after_img, data in rows:
+            collect(after_img)
+            if data:
+                try:
+                    collect(json.loads(data))
+                except ValueError:
+                    pass
+    return sorted(paths)
+
+
+def remove_files(paths, progress=None):
+    for path in paths:
+        if os.path.isfile(path):
+            os.remove(path)
+        if progress:
+            progress()
+    return len(paths)
+
 
 @history_api.delete('/batchRemove')
 def history_delete():
     req_json = request.json
     if 'ids' in req_json:
         ids = req_json['ids']
-        for id in ids:
-            res = Analysis.query.filter_by(id=id).delete()
-            db.session.commit()
-        return success_api(msg="批量删除成功")
+        # remove_files为真时在后台删除结果文件
+        files = result_files(ids) if req_json.get('remove_files') else []
+        count = delete_by_ids(Analysis, ids, chunk_size=DELETE_CHUNK_SIZE)
+        clear_count_cache()
+        response_cache.invalidate()
+        data = {"count": count}
+        if files:
+            job = jobs.submit(
+                "remove_files", remove_files, files, total=len(files))
+            data["job_id"] = job.id
+        return success_api(msg="批量删除成功", data=data)
     return fail_api(msg="参数异常")
-    pass
@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+
+from applications.extensions import metrics
+
+metrics_api = Blueprint('metrics_api', __name__)
+
+
+@metrics_api.get('/metrics')
+def get_metrics():
+    return Response(
+        metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -1,40 +1,23 @@
-import os
-
 from flask import Blueprint
 
 from applications.common.utils.http import success_api, fail_api
-from applications.interface.utils import get_model_info
+from applications.extensions import predictor_cache, model_registry
+from applications.extensions.model_registry import MODEL_TYPES, ModelFormatError
 
 model_api = Blueprint('model_api', __name__, url_prefix='/api/model')
 
 
 @model_api.get('/list/<string:model_type>')
 def get_model_list(model_type):
-    types_list = {
-        "change_detection": "change_detector",
-        "classification": "classifier",
-        "image_restoration": "restorer",
-        "object_detection": "detector",
-        "semantic_segmentation": "segmenter"
-    }
-    if model_type not in types_list:
+    if model_type not in MODEL_TYPES:
         return fail_api("模型类型不正确")
-    model_list = []
-    if os.path.exists("model/{}".format(model_type)):
-        for dirname in os.listdir("model/{}".format(model_type)):
-            if not os.path.isdir("model/{}/{}".format(model_type, dirname)):
-                continue
-            try:
-                model_info = get_model_info("model/{}/{}".format(model_type,
-                                                                 dirname))
-                if model_info["_Attributes"]["model_type"] == types_list[
-                        model_type]:
-                    model_list.append({
-                        "model_path": "model/{}/{}".format(model_type, dirname),
-                        "model_type": model_info["_Attributes"]["model_type"],
-                        "model_name": model_info["Model"]
-                    })
-            except:
-                return fail_api("model/{}/{}下存放的模型格式非法，请检查".format(model_type,
-                                                                   dirname))
+    try:
+        model_list = model_registry.list(model_type)
+    except ModelFormatError as e:
+        return fail_api("{}下存放的模型格式非法，请检查".format(e.model_dir))
     return success_api(data=model_list)
+
+
+@model_api.get('/cache')
+def get_cache_stats():
+    return success_api(data=predictor_cache.stats())
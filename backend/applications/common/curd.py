@@ -79,6 +79,27 @@ def delete_one_by_id(model: db.Model, id):
     return r
 
 
+def delete_by_ids(model: db.Model, ids, chunk_size=1000):
+    """
+    在一个事务中批量删除，id较多时分块执行IN删除
+    :param model: 模型类
+    :param ids: id列表
+    :param chunk_size: 每条删除语句包含的id个数
+    :return: 删除的行数
+    """
+    count = 0
+    try:
+        for i in range(0, len(ids), chunk_size):
+            count += model.query.filter(
+                model.id.in_(ids[i:i + chunk_size])).delete(
+                    synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return count
+
+
 # 启动状态
 def enable_status(model: db.Model, id):
     enable = 1
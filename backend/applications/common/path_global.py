@@ -1,4 +1,5 @@
 import hashlib
+import os.path as osp
 import random
 
 # 上传文件地址
@@ -18,6 +19,16 @@ def md5_name(name):
     return nname
 
 
+def content_name(name, *keys):
+    """
+    按(输入内容摘要, 操作, 参数)生成确定的文件名，相同输入与处理得到相同的文件名
+    :param name: 原文件名，用于保留扩展名
+    :param keys: 输入内容摘要、操作类型与参数
+    """
+    digest = hashlib.md5("|".join(str(k) for k in keys).encode()).hexdigest()
+    return digest + osp.splitext(name)[1]
+
+
 """
  1=直方图匹配，
  2=对比度自适应直方图均衡化(CLAHE)，
@@ -1,5 +1,11 @@
 from applications.common.scripts.init_db import init_db
+from applications.extensions import db
 
 
 def init_script(app):
+    if app.config.get("TESTING"):
+        # 测试环境不连接MySQL，按模型定义直接建表
+        with app.app_context():
+            db.create_all()
+        return
     init_db()
@@ -75,9 +75,56 @@ def execute_fromfile(filename):
     db.close()
 
 
+# 已有数据库的增量升级，启动时检查缺少的列和索引并补齐，可重复执行
+# (表名, 列名, 添加语句)
+UPGRADE_COLUMNS = [
+    ("photo", "hash",
+     "ALTER TABLE `photo` ADD COLUMN `hash` char(64) DEFAULT NULL COMMENT '文件内容sha256'"),
+]
+# (表名, 索引名, 添加语句)
+UPGRADE_INDEXES = [
+    ("photo", "ix_photo_hash",
+     "ALTER TABLE `photo` ADD INDEX `ix_photo_hash` (`hash`)"),
+    ("analysis", "ix_analysis_type_create_time_id",
+     "ALTER TABLE `analysis` ADD INDEX `ix_analysis_type_create_time_id` (`type`, `create_time`, `id`)"),
+    ("analysis", "ix_analysis_create_time_id",
+     "ALTER TABLE `analysis` ADD INDEX `ix_analysis_create_time_id` (`create_time`, `id`)"),
+]
+
+
+def upgrade_db():
+    db = pymysql.connect(
+        host=HOST,
+        port=PORT,
+        user=USERNAME,
+        password=PASSWORD,
+        database=DATABASE,
+        charset='utf8mb4')
+    cursor = db.cursor()
+    try:
+        for table, column, sql in UPGRADE_COLUMNS:
+            cursor.execute(
+                "SELECT COUNT(*) FROM `INFORMATION_SCHEMA`.`COLUMNS` WHERE `table_schema` = %s AND `table_name` = %s AND `column_name` = %s;",
+                (DATABASE, table, column))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(sql)
+                print('表%s添加列%s' % (table, column))
+        for table, index, sql in UPGRADE_INDEXES:
+            cursor.execute(
+                "SELECT COUNT(*) FROM `INFORMATION_SCHEMA`.`STATISTICS` WHERE `table_schema` = %s AND `table_name` = %s AND `index_name` = %s;",
+                (DATABASE, table, index))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(sql)
+                print('表%s添加索引%s' % (table, index))
+        db.commit()
+    finally:
+        db.close()
+
+
 def init_db():
     if is_exist_database()[0][0] > 0:
         print('数据库%s不为空，不进行初始化操作' % str(DATABASE))
+        upgrade_db()
         return
     if init_database():
         print('数据库%s创建成功' % str(DATABASE))
@@ -0,0 +1,9 @@
+def chunked(items, size):
+    """
+    将列表按size切分，size<=0时不切分
+    用于分批推理：每批结果处理保存后即释放，峰值内存与请求的图片数无关
+    """
+    if size <= 0:
+        size = max(len(items), 1)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -13,8 +13,8 @@ def fail_api(msg: str="失败", code_id: int=FAIL):
     return jsonify(success=False, code=code_id, msg=msg)
 
 
-def table_api(msg: str="", count=0, data=None, limit=10):
-    """ 动态表格渲染响应 """
+def table_api(msg: str="", count=0, data=None, limit=10, next_cursor=None):
+    """ 动态表格渲染响应，游标分页时返回下一页的游标next_cursor """
     res = {
         'success': True,
         'msg': msg,
@@ -23,4 +23,6 @@ def table_api(msg: str="", count=0, data=None, limit=10):
         'count': count,
         'limit': limit
     }
+    if next_cursor is not None:
+        res['next_cursor'] = next_cursor
     return jsonify(res)
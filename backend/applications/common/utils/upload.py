@@ -1,3 +1,4 @@
+import hashlib
 import os
 import os.path as osp
 import uuid
@@ -7,6 +8,7 @@ from sqlalchemy import desc
 
 from applications.common.curd import model_to_dicts
 from applications.extensions import db
+from applications.extensions.flask_uploads import UploadNotAllowed, extension
 from applications.extensions.init_upload import photos
 from applications.models import Photo
 from applications.schemas import PhotoOutSchema
@@ -20,14 +22,95 @@ def get_photo(page, limit):
     return data, count
 
 
+class HashWriter:
+    """写入文件的同时计算内容的sha256"""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self.f.write(data)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """分块读取文件计算内容的sha256"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def backfill_hash(upload_url, size):
+    """
+    为添加hash列之前上传的图片补充摘要，只计算与新图片大小相同的记录
+    :param upload_url: 图片保存路径
+    :param size: 新图片的字节数
+    """
+    olds = Photo.query.filter(
+        Photo.hash.is_(None), Photo.size == str(size)).all()
+    digests = dict()
+    for old in olds:
+        path = osp.join(upload_url, old.name)
+        if not osp.isfile(path):
+            continue
+        # 多条记录可能共用一个文件
+        if old.name not in digests:
+            digests[old.name] = file_sha256(path)
+        old.hash = digests[old.name]
+    if digests:
+        db.session.commit()
+
+
 def upload_one(photo, mime, type_=0):
-    filename = photos.save(photo, name=str(uuid.uuid4()) + ".")
-    file_url = '/_uploads/photos/' + filename
-    # file_url = photos.url(filename)
+    """
+    保存上传的图片，内容与已上传的图片相同时不再写入新文件：
+    同一功能类型已有记录时直接返回该记录，否则新建一条指向已有文件的记录
+    :return: 图片链接与图片记录id
+    """
+    basename = photos.get_basename(photo.filename)
+    if not photos.file_allowed(photo, basename):
+        raise UploadNotAllowed()
     upload_url = current_app.config.get("UPLOADED_PHOTOS_DEST")
+    os.makedirs(upload_url, exist_ok=True)
+    filename = str(uuid.uuid4()) + "." + extension(basename)
+    # 先写入临时文件，边写边计算摘要
+    tmp = osp.join(upload_url, "." + filename)
+    with open(tmp, "wb") as f:
+        writer = HashWriter(f)
+        photo.save(writer)
+    digest = writer.hexdigest()
+    backfill_hash(upload_url, os.path.getsize(tmp))
+    exists = [
+        p for p in Photo.query.filter_by(hash=digest).order_by(Photo.id)
+        if osp.isfile(osp.join(upload_url, p.name))
+    ]
+    for exist in exists:
+        if exist.type == type_:
+            os.remove(tmp)
+            return exist.href, exist.id
+    if exists:
+        # 其他功能类型上传过相同内容，复用已有文件
+        os.remove(tmp)
+        filename = exists[0].name
+        file_url = exists[0].href
+    else:
+        os.replace(tmp, osp.join(upload_url, filename))
+        file_url = '/_uploads/photos/' + filename
+    # file_url = photos.url(filename)
     size = os.path.getsize(upload_url + '/' + filename)
     photo = Photo(
-        name=filename, href=file_url, mime=mime, size=size, type=type_)
+        name=filename,
+        href=file_url,
+        mime=mime,
+        size=size,
+        type=type_,
+        hash=digest)
     db.session.add(photo)
     db.session.commit()
     return file_url, photo.id
@@ -37,8 +120,10 @@ def delete_photo_by_id(_id):
     photo_name = Photo.query.filter_by(id=_id).first().name
     photo = Photo.query.filter_by(id=_id).delete()
     db.session.commit()
-    upload_url = current_app.config.get("UPLOADED_PHOTOS_DEST")
-    os.remove(upload_url + '/' + photo_name)
+    # 相同内容的图片记录共用一个文件，没有其他记录引用时才删除文件
+    if Photo.query.filter_by(name=photo_name).count() == 0:
+        upload_url = current_app.config.get("UPLOADED_PHOTOS_DEST")
+        os.remove(upload_url + '/' + photo_name)
     return photo
 
 
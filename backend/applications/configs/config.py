@@ -20,6 +20,45 @@ class BaseConfig:
     REDIS_HOST = os.getenv('REDIS_HOST') or "127.0.0.1"
     REDIS_PORT = int(os.getenv('REDIS_PORT') or 6379)
 
+    # 列表接口响应缓存的有效期(秒，0表示不缓存)，是否使用上面的Redis共享缓存
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL') or 60)
+    RESPONSE_CACHE_REDIS = (os.getenv('RESPONSE_CACHE_REDIS') or 'true').lower() == 'true'
+
+    # 是否记录各分析阶段的耗时指标，通过/metrics导出
+    METRICS_ENABLED = (os.getenv('METRICS_ENABLED') or 'true').lower() == 'true'
+
+    # 按需性能分析的结果目录与调用栈采样间隔(秒)，请求头X-Profile: 1或参数profile=1时开启
+    PROFILE_DIR = 'static/upload/res/profile'
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL') or 0.005)
+
+    # 模型存放目录，其下按功能名称分目录存放
+    MODEL_DIR = os.getenv('MODEL_DIR') or 'model'
+
+    # 模型缓存配置，最多缓存的模型个数与模型文件总大小上限(MB)，0表示不限制
+    PREDICTOR_CACHE_SIZE = int(os.getenv('PREDICTOR_CACHE_SIZE') or 4)
+    PREDICTOR_CACHE_MEMORY = int(os.getenv('PREDICTOR_CACHE_MEMORY') or 0)
+
+    # 每次送入模型推理的图片数，0表示整批一次推理
+    INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE') or 8)
+
+    # 分析任务队列配置，工作线程数、排队任务数上限(0表示不限制)与保留的已结束任务数
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS') or 2)
+    JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING') or 0)
+    JOB_HISTORY = int(os.getenv('JOB_HISTORY') or 200)
+    # 请求中wait为真时最多等待的秒数，超时后返回202，客户端改为轮询任务状态
+    JOB_WAIT_TIMEOUT = float(os.getenv('JOB_WAIT_TIMEOUT') or 30)
+
+    # 预处理预览结果缓存目录(需位于上传目录的res子目录下)与总大小上限(MB)
+    ARTIFACT_CACHE_DIR = 'static/upload/res/cache'
+    ARTIFACT_CACHE_SIZE = int(os.getenv('ARTIFACT_CACHE_SIZE') or 512)
+
+    # 图像批处理并行配置，thread或process，工作线程/进程数(0表示使用CPU核数)
+    EXECUTOR_KIND = os.getenv('EXECUTOR_KIND') or 'thread'
+    EXECUTOR_WORKERS = int(os.getenv('EXECUTOR_WORKERS') or 0)
+
+    # 分页总数的缓存时间(秒)，0表示每次翻页都执行COUNT(*)
+    PAGINATE_COUNT_TTL = int(os.getenv('PAGINATE_COUNT_TTL') or 30)
+
     # mysql 配置
     MYSQL_USERNAME = os.getenv('MYSQL_USERNAME') or "root"
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD') or "123456"
@@ -44,7 +83,12 @@ class BaseConfig:
 
 class TestingConfig(BaseConfig):
     """ 测试配置 """
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'  # 内存数据库
+    TESTING = True
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 默认为内存数据库，多线程压测时可通过TEST_DATABASE_URI指定sqlite文件
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        'TEST_DATABASE_URI') or 'sqlite:///:memory:'
+    RESPONSE_CACHE_REDIS = False
 
 
 class DevelopmentConfig(BaseConfig):
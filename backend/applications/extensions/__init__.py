@@ -3,9 +3,25 @@ from flask import Flask
 from .init_dotenv import init_dotenv
 from .init_sqlalchemy import db, ma, init_databases
 from .init_upload import init_upload
+from .init_metrics import metrics, init_metrics
+from .init_profiler import profiler, init_profiler
+from .init_predictor_cache import predictor_cache, init_predictor_cache
+from .init_job_queue import jobs, init_job_queue
+from .init_model_registry import model_registry, init_model_registry
+from .init_artifact_cache import artifact_cache, init_artifact_cache
+from .init_executor import executor, init_executor
+from .init_response_cache import response_cache, init_response_cache
 
 
 def init_plugs(app: Flask) -> None:
     init_databases(app)
     init_upload(app)
     init_dotenv()
+    init_metrics(app)
+    init_profiler(app)
+    init_predictor_cache(app)
+    init_job_queue(app)
+    init_model_registry(app)
+    init_artifact_cache(app)
+    init_executor(app)
+    init_response_cache(app)
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import os.path as osp
+import threading
+import uuid
+from collections import OrderedDict
+
+import cv2
+
+
+class ArtifactCache:
+    """
+    按内容寻址的派生文件缓存，文件名由(输入内容摘要, 操作, 参数)决定，
+    相同输入重复处理时直接复用已有文件，总大小超过上限时按LRU策略删除
+
+    name = content_name(name, fun_type, artifact_cache.file_digest(path))
+    if artifact_cache.get(name) is None:
+        artifact_cache.put(name, img)
+    """
+
+    def __init__(self,
+                 directory="static/upload/res/cache",
+                 max_size=512,
+                 max_digests=4096):
+        """
+        :param directory: 缓存目录
+        :param max_size: 缓存文件总大小上限(MB)，0表示不限制
+        :param max_digests: 保留的输入文件摘要条数，超过时按LRU策略删除
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.max_digests = max_digests
+        self._index = None  # 文件名 -> 大小，按最近使用排序
+        # 输入文件路径 -> (修改时间, 大小, 摘要)，按最近使用排序
+        self._digests = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, directory=None, max_size=None):
+        with self._lock:
+            if directory is not None and directory != self.directory:
+                self.directory = directory
+                self._index = None
+            if max_size is not None:
+                self.max_size = max_size
+
+    def _load_index(self):
+        """首次使用时扫描缓存目录，按修改时间恢复使用顺序，调用方需持有self._lock"""
+        if self._index is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = list()
+        for name in os.listdir(self.directory):
+            path = osp.join(self.directory, name)
+            if osp.isfile(path) and not name.startswith("."):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name, stat.st_size))
+        self._index = OrderedDict(
+            (name, size) for _, name, size in sorted(entries))
+
+    def _evict(self):
+        """淘汰最久未使用的文件，保留刚写入的文件，调用方需持有self._lock"""
+        if not self.max_size:
+            return
+        total = sum(self._index.values())
+        while len(self._index) > 1 and total > self.max_size * 1024 * 1024:
+            name, size = self._index.popitem(last=False)
+            total -= size
+            try:
+                os.remove(osp.join(self.directory, name))
+            except OSError:
+                pass
+
+    def file_digest(self, path):
+        """文件内容的md5摘要，文件未变化时复用上次的结果"""
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._digests.get(path)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns,
+                                                     stat.st_size):
+                self._digests.move_to_end(path)
+                return cached[2]
+        # 计算摘要时不持有锁
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(chunk)
+        digest = md5.hexdigest()
+        with self._lock:
+            self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+            self._digests.move_to_end(path)
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+        return digest
+
+    def path(self, name):
+        return osp.join(self.directory, name)
+
+    def get(self, name):
+        """
+        查找缓存文件
+        :return: 命中时返回文件路径，否则返回None
+        """
+        with self._lock:
+            self._load_index()
+            if name not in self._index:
+                return None
+            path = self.path(name)
+            # 在锁内更新修改时间，避免与淘汰同时进行
+            try:
+                os.utime(path)
+            except OSError:
+                del self._index[name]
+                return None
+            self._index.move_to_end(name)
+        return path
+
+    def temp_path(self, name):
+        """写入缓存前使用的临时文件路径，写入完成后调用add加入缓存"""
+        with self._lock:
+            self._load_index()
+        return osp.join(self.directory, ".{}_{}".format(
+            uuid.uuid4().hex, name))
+
+    def add(self, name, tmp):
+        """
+        将已写好的临时文件加入缓存
+        :param name: content_name生成的文件名
+        :param tmp: temp_path返回的路径
+        :return: 文件路径
+        """
+        path = self.path(name)
+        os.replace(tmp, path)
+        with self._lock:
+            self._index[name] = os.path.getsize(path)
+            self._index.move_to_end(name)
+            self._evict()
+        return path
+
+    def put(self, name, img):
+        """
+        写入缓存文件
+        :param name: content_name生成的文件名
+        :param img: 图像数组
+        :return: 文件路径
+        """
+        tmp = self.temp_path(name)
+        cv2.imwrite(tmp, img)
+        return self.add(name, tmp)
@@ -0,0 +1,91 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+THREAD = "thread"
+PROCESS = "process"
+
+
+class Executor:
+    """
+    图像批处理共享的线程池/进程池，map的结果顺序与输入顺序一致
+
+    executor.configure(kind="process", workers=32)
+    executor.map(partial(process_file, src_dir, save_dir, func), names)
+    进程池模式下func需为可pickle的模块级函数或其functools.partial
+    """
+
+    def __init__(self, kind=THREAD, workers=0):
+        """
+        :param kind: thread或process，opencv的函数大多会释放GIL，线程池即可利用多核
+        :param workers: 工作线程/进程数，0表示使用CPU核数
+        """
+        self.kind = kind
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, kind=None, workers=None):
+        with self._lock:
+            if kind is not None:
+                if kind not in (THREAD, PROCESS):
+                    raise ValueError("unknown executor kind: {}".format(kind))
+                self.kind = kind
+            if workers is not None:
+                self.workers = workers
+            self._shutdown()
+
+    def _shutdown(self):
+        """调用方需持有self._lock"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                workers = self.workers or os.cpu_count() or 1
+                if self.kind == PROCESS:
+                    self._pool = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="image")
+            return self._pool
+
+    def map(self, func, items, callback=None):
+        """
+        并行执行func(item)
+        :param callback: 每得到一项结果时在调用线程中调用一次，用于报告进度
+        :return: 与items一一对应的结果列表
+        """
+        items = list(items)
+        if len(items) <= 1 or self.workers == 1 or getattr(
+                self._local, "serial", False):
+            results = map(func, items)
+        else:
+            results = self._get_pool().map(func, items)
+        temps = list()
+        for res in results:
+            temps.append(res)
+            if callback:
+                callback()
+        return temps
+
+    @contextmanager
+    def serial(self):
+        """
+        在当前线程内直接执行map，不提交到线程池/进程池，
+        用于性能分析，使全部工作都在被分析的线程中完成
+        """
+        previous = getattr(self._local, "serial", False)
+        self._local.serial = True
+        try:
+            yield
+        finally:
+            self._local.serial = previous
+
+    def shutdown(self):
+        with self._lock:
+            self._shutdown()
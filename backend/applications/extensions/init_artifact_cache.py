@@ -0,0 +1,11 @@
+from flask import Flask
+
+from .artifact_cache import ArtifactCache
+
+artifact_cache = ArtifactCache()
+
+
+def init_artifact_cache(app: Flask):
+    artifact_cache.configure(
+        directory=app.config.get("ARTIFACT_CACHE_DIR"),
+        max_size=app.config.get("ARTIFACT_CACHE_SIZE"))
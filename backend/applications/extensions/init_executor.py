@@ -0,0 +1,11 @@
+from flask import Flask
+
+from .executor import Executor
+
+executor = Executor()
+
+
+def init_executor(app: Flask):
+    executor.configure(
+        kind=app.config.get("EXECUTOR_KIND"),
+        workers=app.config.get("EXECUTOR_WORKERS"))
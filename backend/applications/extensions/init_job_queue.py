@@ -0,0 +1,13 @@
+from flask import Flask
+
+from .job_queue import JobQueue
+
+jobs = JobQueue()
+
+
+def init_job_queue(app: Flask):
+    jobs.init_app(
+        app,
+        workers=app.config.get("JOB_WORKERS", 2),
+        max_pending=app.config.get("JOB_MAX_PENDING", 0),
+        history=app.config.get("JOB_HISTORY", 200))
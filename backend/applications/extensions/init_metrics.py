@@ -0,0 +1,9 @@
+from flask import Flask
+
+from .metrics import Metrics
+
+metrics = Metrics()
+
+
+def init_metrics(app: Flask):
+    metrics.configure(enabled=app.config.get("METRICS_ENABLED", True))
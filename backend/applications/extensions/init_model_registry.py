@@ -0,0 +1,10 @@
+from flask import Flask
+
+from .model_registry import ModelRegistry
+
+model_registry = ModelRegistry()
+
+
+def init_model_registry(app: Flask):
+    model_registry.root = app.config.get("MODEL_DIR", "model")
+    model_registry.refresh()
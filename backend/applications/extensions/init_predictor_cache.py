@@ -0,0 +1,11 @@
+from flask import Flask
+
+from .predictor_cache import PredictorCache
+
+predictor_cache = PredictorCache()
+
+
+def init_predictor_cache(app: Flask):
+    predictor_cache.configure(
+        max_entries=app.config.get("PREDICTOR_CACHE_SIZE", 4),
+        max_memory=app.config.get("PREDICTOR_CACHE_MEMORY", 0))
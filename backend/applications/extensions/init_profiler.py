@@ -0,0 +1,11 @@
+from flask import Flask
+
+from .profiler import Profiler
+
+profiler = Profiler()
+
+
+def init_profiler(app: Flask):
+    profiler.configure(
+        directory=app.config.get("PROFILE_DIR"),
+        interval=app.config.get("PROFILE_INTERVAL"))
@@ -0,0 +1,12 @@
+from flask import Flask
+
+from .response_cache import ResponseCache
+
+response_cache = ResponseCache()
+
+
+def init_response_cache(app: Flask):
+    response_cache.init_app(
+        app,
+        ttl=app.config.get("RESPONSE_CACHE_TTL", 60),
+        use_redis=app.config.get("RESPONSE_CACHE_REDIS", True))
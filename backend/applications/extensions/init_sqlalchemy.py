@@ -1,11 +1,14 @@
 import datetime
+import threading
+import time
 
 from flask import Flask, request
 from flask_marshmallow import Marshmallow
-from flask_sqlalchemy import SQLAlchemy, BaseQuery
+from flask_sqlalchemy import SQLAlchemy, BaseQuery, Pagination
 from marshmallow import fields
 from marshmallow.validate import (URL, Email, Range, Length, Equal, Regexp,
                                   Predicate, NoneOf, OneOf, ContainsOnly)
+from sqlalchemy import and_, desc, or_
 
 URL.default_message = '无效的链接'
 Email.default_message = '无效的邮箱地址'
@@ -38,6 +41,32 @@ fields.Number.default_error_messages = {"invalid": "不是合法数字"}
 fields.Boolean.default_error_messages = {"invalid": "不是合法布尔值"}
 
 
+# 查询语句 -> (过期时间, 总数)
+_count_cache = dict()
+_count_lock = threading.Lock()
+
+
+def clear_count_cache():
+    """数据发生增删后清除缓存的总数"""
+    with _count_lock:
+        _count_cache.clear()
+
+
+def encode_cursor(create_time, id):
+    return "{}_{}".format(create_time.isoformat(), id)
+
+
+def decode_cursor(cursor):
+    """
+    :return: (create_time, id)，格式非法时返回None
+    """
+    try:
+        create_time, id = cursor.rsplit("_", 1)
+        return datetime.datetime.fromisoformat(create_time), int(id)
+    except (AttributeError, ValueError):
+        return None
+
+
 class Query(BaseQuery):
     def soft_delete(self):
         return self.update({"delete_at": datetime.datetime.now()})
@@ -48,10 +77,73 @@ class Query(BaseQuery):
     def all_json(self, schema: Marshmallow().Schema):
         return schema(many=True).dump(self.all())
 
-    def layui_paginate(self):
+    def layui_paginate(self, count_ttl=0):
+        """
+        :param count_ttl: 大于0时总数缓存count_ttl秒，不必每次翻页都执行COUNT(*)
+        """
         limit = request.args.get('limit', type=int)
         page = request.args.get('page', type=int)
-        return self.paginate(page=page, per_page=limit, error_out=False)
+        if not count_ttl:
+            return self.paginate(page=page, per_page=limit, error_out=False)
+        page = page if page and page > 0 else 1
+        limit = limit if limit and limit > 0 else 20
+        items = self.limit(limit).offset((page - 1) * limit).all()
+        total = self.order_by(None).cached_count(count_ttl)
+        return Pagination(self, page, limit, total, items)
+
+    def cached_count(self, ttl=30):
+        """
+        缓存ttl秒的总数，相同的查询条件共享缓存
+        """
+        statement = self.statement.compile()
+        key = (str(statement), tuple(sorted(statement.params.items())))
+        now = time.monotonic()
+        with _count_lock:
+            cached = _count_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        total = self.count()
+        with _count_lock:
+            _count_cache[key] = (now + ttl, total)
+        return total
+
+    def keyset_paginate(self, time_column, id_column):
+        """
+        游标分页，按(time_column, id_column)倒序，从请求参数cursor指定的位置开始取limit条，
+        查询代价与页码深度无关，需要(time_column, id_column)上的索引
+        Analysis.query.filter_by(type=1).keyset_paginate(Analysis.create_time, Analysis.id)
+        :return: 本页数据与下一页的游标，没有下一页时游标为None
+        """
+        limit = request.args.get('limit', type=int)
+        limit = limit if limit and limit > 0 else 20
+        query = self.order_by(None).order_by(desc(time_column), desc(id_column))
+        cursor = decode_cursor(request.args.get('cursor'))
+        if cursor is not None:
+            create_time, id = cursor
+            query = query.filter(
+                or_(time_column < create_time,
+                    and_(time_column == create_time, id_column < id)))
+        # 多取一条判断是否还有下一页
+        items = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(
+                getattr(last, time_column.key), getattr(last, id_column.key))
+        return items, next_cursor
+
+    def table_paginate(self, time_column, id_column, count_ttl=0):
+        """
+        请求参数中有cursor时使用游标分页，否则使用页码分页
+        :return: 本页数据, 总数, 下一页的游标
+        """
+        if 'cursor' in request.args:
+            items, next_cursor = self.keyset_paginate(time_column, id_column)
+            total = self.order_by(None).cached_count(count_ttl)
+            return items, total, next_cursor
+        page = self.layui_paginate(count_ttl)
+        return page.items, page.total, None
 
     def layui_paginate_json(self, schema: Marshmallow().Schema):
         """
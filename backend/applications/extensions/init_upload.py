@@ -3,7 +3,8 @@ from flask import Flask
 from .flask_uploads import UploadSet, IMAGES
 from .flask_uploads import configure_uploads
 
-photos = UploadSet('photos', IMAGES)
+# 大幅遥感影像以GeoTIFF格式上传
+photos = UploadSet('photos', IMAGES + ('tif', 'tiff'))
 
 
 def init_upload(app: Flask):
@@ -0,0 +1,161 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .init_executor import executor
+from .init_profiler import profiler
+
+
+class JobQueueFull(Exception):
+    """等待执行的任务数超过上限"""
+
+
+class Job:
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCESS = "success"
+    FAILED = "failed"
+
+    def __init__(self, name, total=0, profile=False):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.profile = profile
+        self.status = self.PENDING
+        self.total = total
+        self.done = 0
+        self.result = None
+        self.error = None
+        self.create_time = time.time()
+        self.start_time = None
+        self.end_time = None
+        self._finished = threading.Event()
+
+    def advance(self, n=1):
+        """任务进度前进n步，由任务函数在每处理完一张图片后调用"""
+        self.done += n
+
+    @property
+    def progress(self):
+        """已完成的比例，0~1"""
+        if not self.total:
+            return 1.0 if self.finished else 0.0
+        return min(self.done / self.total, 1.0)
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "create_time": self.create_time,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "profile": self.profile
+        }
+
+
+class JobQueue:
+    """
+    进程内任务队列，使用有限个工作线程在应用上下文中执行耗时任务
+
+    job = jobs.submit("change_detection", change_detection, *args, total=10)
+    jobs.get(job.id).to_dict()
+    任务函数需接收progress关键字参数，每完成一项调用一次progress()
+    """
+
+    def __init__(self, workers=2, max_pending=0, history=200):
+        """
+        :param workers: 工作线程数
+        :param max_pending: 排队与执行中的任务数上限，0表示不限制
+        :param history: 保留已结束任务记录的个数
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.history = history
+        self.app = None
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, workers=None, max_pending=None, history=None):
+        self.app = app
+        if workers is not None:
+            self.workers = workers
+        if max_pending is not None:
+            self.max_pending = max_pending
+        if history is not None:
+            self.history = history
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="job")
+
+    def _pending(self):
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _trim(self):
+        """清理超出保留个数的已结束任务，调用方需持有self._lock"""
+        finished = [k for k, job in self._jobs.items() if job.finished]
+        for key in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[key]
+
+    def submit(self, name, func, *args, total=0, profile=False, **kwargs):
+        """
+        提交任务
+        :param name: 任务名称
+        :param func: 任务函数，返回值保存在job.result中
+        :param total: 任务包含的处理项数，用于报告进度
+        :param profile: 是否对任务进行性能分析，结果文件以任务id命名
+        :return: Job
+        """
+        job = Job(name, total=total, profile=profile)
+        with self._lock:
+            if self.max_pending and self._pending() >= self.max_pending:
+                raise JobQueueFull()
+            self._trim()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        job.status = Job.RUNNING
+        job.start_time = time.time()
+        try:
+            with self.app.app_context():
+                if job.profile:
+                    # 分析器只能观察任务线程，executor中的工作改为在任务线程内串行执行
+                    with profiler.profile(job.id), executor.serial():
+                        job.result = func(
+                            *args, progress=job.advance, **kwargs)
+                else:
+                    job.result = func(*args, progress=job.advance, **kwargs)
+            job.status = Job.SUCCESS
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = Job.FAILED
+        finally:
+            job.end_time = time.time()
+            job._finished.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
@@ -0,0 +1,231 @@
+import bisect
+import os.path as osp
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# 阶段耗时直方图的桶(秒)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+           120, 300)
+
+COUNTER = "counter"
+HISTOGRAM = "histogram"
+
+STAGE_DURATION = "rs_stage_duration_seconds"
+PIPELINE_TOTAL = "rs_pipeline_total"
+
+
+def model_label(model_path):
+    return osp.basename(osp.normpath(model_path)) if model_path else ""
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"'))
+                          for k, v in labels) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """
+    进程内指标，包括计数器与耗时直方图，以Prometheus文本格式导出
+
+    @metrics.task("change_detection")
+    def change_detection(model_path, ...):
+        with metrics.timer("preprocess"):
+            ...
+    timer的标签自动带上当前任务的task与model
+    指标在记录前需用declare声明类型与HELP说明
+    """
+
+    def __init__(self, enabled=True, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters = dict()  # (名称, 标签) -> 值
+        self._histograms = dict()  # (名称, 标签) -> _Histogram
+        self._declared = dict()  # 名称 -> (类型, HELP说明)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.declare(STAGE_DURATION, HISTOGRAM,
+                     "Duration of analysis pipeline stages.")
+        self.declare(PIPELINE_TOTAL, COUNTER,
+                     "Analysis pipelines run, by result.")
+
+    def configure(self, enabled=None):
+        if enabled is not None:
+            self.enabled = enabled
+
+    def _labels(self, labels):
+        merged = dict(getattr(self._local, "labels", None) or {})
+        merged.update(labels)
+        return tuple(sorted(merged.items()))
+
+    def declare(self, name, kind, help):
+        """
+        声明指标，类型与HELP说明只在此处设置一次
+        :param kind: counter或histogram
+        """
+        if kind not in (COUNTER, HISTOGRAM):
+            raise ValueError("unknown metric kind: {}".format(kind))
+        with self._lock:
+            declared = self._declared.get(name)
+            if declared is not None and declared[0] != kind:
+                raise ValueError("metric {} is already declared as {}".format(
+                    name, declared[0]))
+            self._declared[name] = (kind, help)
+
+    def _check(self, name, kind):
+        declared = self._declared.get(name)
+        if declared is None or declared[0] != kind:
+            raise ValueError("{} {} is not declared".format(kind, name))
+
+    def _record(self, kind, name, value, labels):
+        """recording期间暂存指标，返回是否已暂存"""
+        recorded = getattr(self._local, "recorded", None)
+        if recorded is None:
+            return False
+        recorded.append((kind, name, value, labels))
+        return True
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        self._check(name, COUNTER)
+        if self._record(COUNTER, name, value, labels):
+            return
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        self._check(name, HISTOGRAM)
+        if self._record(HISTOGRAM, name, value, labels):
+            return
+        key = (name, self._labels(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            if index < len(self.buckets):
+                hist.counts[index] += 1
+            hist.sum += value
+            hist.count += 1
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """记录一个阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                STAGE_DURATION,
+                time.perf_counter() - start,
+                stage=stage,
+                **labels)
+
+    @contextmanager
+    def recording(self):
+        """
+        暂存当前线程内记录的指标而不写入，用于在executor中执行的任务：
+        进程池的子进程中记录的指标无法到达主进程，任务返回暂存的列表，
+        由提交任务的线程调用replay写入，并附加该线程的标签
+
+        with metrics.recording() as recorded:
+            ...
+        return res, recorded
+        """
+        previous = getattr(self._local, "recorded", None)
+        recorded = self._local.recorded = list()
+        try:
+            yield recorded
+        finally:
+            self._local.recorded = previous
+
+    def replay(self, recorded):
+        """写入recording暂存的指标"""
+        for kind, name, value, labels in recorded:
+            if kind == COUNTER:
+                self.inc(name, value, **labels)
+            else:
+                self.observe(name, value, **labels)
+
+    @contextmanager
+    def context(self, **labels):
+        """在当前线程内为之后记录的指标附加标签"""
+        previous = getattr(self._local, "labels", None)
+        self._local.labels = dict(previous or {}, **labels)
+        try:
+            yield
+        finally:
+            self._local.labels = previous
+
+    def task(self, name):
+        """
+        分析流程的装饰器，被装饰函数的第一个参数为模型路径，
+        记录流程总耗时与执行结果，并为流程内的指标附加task、model标签
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(model_path, *args, **kwargs):
+                with self.context(task=name, model=model_label(model_path)):
+                    status = "success"
+                    try:
+                        with self.timer("total"):
+                            return func(model_path, *args, **kwargs)
+                    except Exception:
+                        status = "failed"
+                        raise
+                    finally:
+                        self.inc(PIPELINE_TOTAL, status=status)
+
+            return wrapper
+
+        return decorator
+
+    def render(self):
+        """Prometheus文本格式"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count))
+                for key, h in self._histograms.items())
+            declared = dict(self._declared)
+        lines = list()
+        last = None
+        for (name, labels), value in counters:
+            if name != last:
+                lines.append("# HELP {} {}".format(name, declared[name][1]))
+                lines.append("# TYPE {} {}".format(name, COUNTER))
+                last = name
+            lines.append("{}{} {}".format(name, _format_labels(labels), value))
+        for (name, labels), (counts, total, count) in histograms:
+            if name != last:
+                lines.append("# HELP {} {}".format(name, declared[name][1]))
+                lines.append("# TYPE {} {}".format(name, HISTOGRAM))
+                last = name
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append("{}_bucket{} {}".format(
+                    name, _format_labels(labels + (("le", repr(float(bound))),
+                                                   )), cumulative))
+            lines.append("{}_bucket{} {}".format(
+                name, _format_labels(labels + (("le", "+Inf"), )), count))
+            lines.append("{}_sum{} {}".format(name,
+                                              _format_labels(labels), total))
+            lines.append("{}_count{} {}".format(name,
+                                                _format_labels(labels), count))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,122 @@
+import os
+import os.path as osp
+import threading
+
+import yaml
+
+# 接口中的功能名称与model.yml中模型类型的对应关系
+MODEL_TYPES = {
+    "change_detection": "change_detector",
+    "classification": "classifier",
+    "image_restoration": "restorer",
+    "object_detection": "detector",
+    "semantic_segmentation": "segmenter"
+}
+
+
+class ModelFormatError(Exception):
+    """模型目录下的model.yml不存在或格式非法"""
+
+    def __init__(self, model_dir):
+        super().__init__(model_dir)
+        self.model_dir = model_dir
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ModelRegistry:
+    """
+    模型索引，缓存model/<功能>/<模型>/model.yml的解析结果，
+    目录或model.yml的修改时间变化时只重新读取发生变化的部分
+
+    model_registry.list("change_detection")
+    model_registry.model_type("model/change_detection/bit")
+    """
+
+    def __init__(self, root="model"):
+        self.root = root
+        self._infos = dict()  # 模型路径 -> (model.yml修改时间, 解析结果)
+        self._dirs = dict()  # 功能目录 -> (目录修改时间, 模型目录名列表)
+        self._lock = threading.Lock()
+
+    def info(self, model_dir):
+        """
+        获取模型的model.yml内容
+        :param model_dir: 模型路径
+        :return: model.yml解析得到的dict
+        """
+        key = osp.normpath(model_dir)
+        yml = osp.join(key, "model.yml")
+        mtime = _mtime(yml)
+        if mtime is None:
+            raise FileNotFoundError(
+                "There is no file named model.yml in {}.".format(model_dir))
+        with self._lock:
+            cached = self._infos.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(yml) as f:
+            model_info = yaml.load(f.read(), Loader=yaml.Loader)
+        with self._lock:
+            self._infos[key] = (mtime, model_info)
+        return model_info
+
+    def model_type(self, model_dir):
+        return self.info(model_dir)["_Attributes"]["model_type"]
+
+    def _model_dirs(self, type_dir):
+        mtime = _mtime(type_dir)
+        if mtime is None:
+            return []
+        with self._lock:
+            cached = self._dirs.get(type_dir)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        dirnames = sorted(dirname for dirname in os.listdir(type_dir)
+                          if osp.isdir(osp.join(type_dir, dirname)))
+        with self._lock:
+            self._dirs[type_dir] = (mtime, dirnames)
+            # 清理已被删除的模型
+            prefix = osp.normpath(type_dir) + os.sep
+            for key in [
+                    k for k in self._infos
+                    if k.startswith(prefix) and osp.basename(k) not in dirnames
+            ]:
+                del self._infos[key]
+        return dirnames
+
+    def list(self, name):
+        """
+        列出某个功能下可用的模型
+        :param name: 功能名称，为MODEL_TYPES的键
+        :return: 模型信息列表
+        """
+        type_dir = "{}/{}".format(self.root, name)
+        model_list = []
+        for dirname in self._model_dirs(type_dir):
+            model_dir = "{}/{}".format(type_dir, dirname)
+            try:
+                model_info = self.info(model_dir)
+                model_type = model_info["_Attributes"]["model_type"]
+                if model_type == MODEL_TYPES[name]:
+                    model_list.append({
+                        "model_path": model_dir,
+                        "model_type": model_type,
+                        "model_name": model_info["Model"]
+                    })
+            except Exception:
+                raise ModelFormatError(model_dir)
+        return model_list
+
+    def refresh(self):
+        """重新扫描全部功能目录，仅解析发生变化的model.yml"""
+        for name in MODEL_TYPES:
+            try:
+                self.list(name)
+            except ModelFormatError:
+                pass
@@ -0,0 +1,190 @@
+import os
+import os.path as osp
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .init_metrics import metrics
+from .metrics import model_label, STAGE_DURATION
+
+# 判断模型是否被修改时需要检查的文件
+MODEL_FILES = ("model.yml", "model.pdmodel", "model.pdiparams")
+
+
+def model_signature(model_dir):
+    """
+    根据模型文件的修改时间与大小生成签名，模型文件被替换后签名随之改变
+    :param model_dir: 模型路径
+    :return: 签名元组与模型文件总大小(字节)
+    """
+    signature = list()
+    total = 0
+    for filename in MODEL_FILES:
+        path = osp.join(model_dir, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signature.append((filename, None, None))
+            continue
+        signature.append((filename, stat.st_mtime_ns, stat.st_size))
+        total += stat.st_size
+    return tuple(signature), total
+
+
+class _Entry:
+    def __init__(self, predictor, signature, size):
+        self.predictor = predictor
+        self.signature = signature
+        self.size = size
+        # paddle推理预测器不是线程安全的，同一模型的推理需要串行
+        self.lock = threading.RLock()
+
+
+class PredictorCache:
+    """
+    进程内共享的Predictor缓存，以模型路径和设备参数为键，按LRU策略淘汰
+
+    predictor_cache.configure(max_entries=4, max_memory=2048)
+    with predictor_cache.acquire(model_path, use_gpu=True) as predictor:
+        predictor.predict(image_list)
+    """
+
+    def __init__(self, max_entries=4, max_memory=0, loader=None):
+        """
+        :param max_entries: 最多缓存的模型个数，0表示不限制
+        :param max_memory: 缓存模型文件的总大小上限(MB)，0表示不限制
+        :param loader: 构建Predictor的函数，默认使用paddlers.deploy.Predictor
+        """
+        self.max_entries = max_entries
+        self.max_memory = max_memory
+        self.loader = loader
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.load_count = 0
+        self.load_time = 0.0
+
+    def configure(self, max_entries=None, max_memory=None, loader=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_memory is not None:
+                self.max_memory = max_memory
+            if loader is not None:
+                self.loader = loader
+            self._evict()
+
+    @staticmethod
+    def make_key(model_path, **options):
+        return (osp.abspath(model_path), tuple(sorted(options.items())))
+
+    def _load(self, model_path, **options):
+        loader = self.loader
+        if loader is None:
+            import paddlers as pdrs
+            loader = pdrs.deploy.Predictor
+        start = time.perf_counter()
+        predictor = loader(model_path, **options)
+        elapsed = time.perf_counter() - start
+        metrics.observe(
+            STAGE_DURATION,
+            elapsed,
+            stage="predictor_load",
+            model=model_label(model_path))
+        with self._lock:
+            self.load_count += 1
+            self.load_time += elapsed
+        return predictor
+
+    def _memory(self):
+        return sum(entry.size for entry in self._entries.values())
+
+    def _evict(self):
+        """淘汰最久未使用的模型直至满足个数和内存限制，调用方需持有self._lock"""
+        while len(self._entries) > 1:
+            over_entries = self.max_entries and len(
+                self._entries) > self.max_entries
+            over_memory = self.max_memory and self._memory(
+            ) > self.max_memory * 1024 * 1024
+            if not (over_entries or over_memory):
+                break
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get_entry(self, model_path, **options):
+        key = self.make_key(model_path, **options)
+        signature, size = model_signature(model_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature != signature:
+                # model.yml或权重文件在磁盘上发生了变化
+                del self._entries[key]
+                self.invalidations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = _Entry(self._load(model_path, **options), signature, size)
+        with self._lock:
+            # 并发加载同一模型时保留先放入缓存的实例
+            current = self._entries.get(key)
+            if current is not None and current.signature == signature:
+                self._entries.move_to_end(key)
+                return current
+            self._entries[key] = entry
+            self._evict()
+        return entry
+
+    def get(self, model_path, **options):
+        """
+        获取缓存的Predictor，不加锁，调用方需自行保证不会并发推理
+        :param model_path: 模型路径
+        :param options: 传给Predictor的设备参数，如use_gpu、gpu_id
+        """
+        return self._get_entry(model_path, **options).predictor
+
+    @contextmanager
+    def acquire(self, model_path, **options):
+        """
+        获取缓存的Predictor并在使用期间独占该模型
+        :param model_path: 模型路径
+        :param options: 传给Predictor的设备参数，如use_gpu、gpu_id
+        """
+        entry = self._get_entry(model_path, **options)
+        with entry.lock:
+            yield entry.predictor
+
+    def invalidate(self, model_path=None):
+        """
+        清除缓存
+        :param model_path: 只清除该模型的缓存，为None时清空全部
+        """
+        with self._lock:
+            if model_path is None:
+                self._entries.clear()
+                return
+            path = osp.abspath(model_path)
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory": self._memory(),
+                "max_memory": self.max_memory * 1024 * 1024,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "load_count": self.load_count,
+                "load_time": self.load_time,
+                "models": [key[0] for key in self._entries]
+            }
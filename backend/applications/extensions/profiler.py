@@ -0,0 +1,90 @@
+import cProfile
+import os
+import os.path as osp
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# 生成的文件类型 -> 扩展名
+PROFILE_FILES = {"stats": ".prof", "collapsed": ".folded"}
+
+
+class _Sampler(threading.Thread):
+    """定时采样目标线程的调用栈，统计为折叠栈格式"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._finish = threading.Event()
+
+    def run(self):
+        while not self._finish.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = list()
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{}:{}".format(
+                    osp.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._finish.set()
+        self.join()
+
+
+class Profiler:
+    """
+    按需对分析任务进行性能分析，生成cProfile统计文件和可用于绘制火焰图的折叠栈文件
+
+    with profiler.profile(job.id):
+        func()
+    profiler.path(job.id, "stats")
+    """
+
+    def __init__(self, directory="static/upload/res/profile", interval=0.005):
+        """
+        :param directory: 分析结果保存目录
+        :param interval: 调用栈采样间隔(秒)
+        """
+        self.directory = directory
+        self.interval = interval
+
+    def configure(self, directory=None, interval=None):
+        if directory is not None:
+            self.directory = directory
+        if interval is not None:
+            self.interval = interval
+
+    def path(self, name, kind):
+        """
+        :param kind: stats或collapsed
+        """
+        return osp.join(self.directory, name + PROFILE_FILES[kind])
+
+    @contextmanager
+    def profile(self, name):
+        """分析当前线程中执行的代码，结束后写入name对应的文件"""
+        os.makedirs(self.directory, exist_ok=True)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 同一时间只能有一个cProfile生效，此时只进行采样
+            profile = None
+        sampler = _Sampler(threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.path(name, "stats"))
+            with open(self.path(name, "collapsed"), "w") as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write("{} {}\n".format(stack, count))
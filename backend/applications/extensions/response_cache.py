@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class _MemoryBackend:
+    """进程内缓存，Redis不可用时使用"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # 键 -> (过期时间, 响应内容)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            cached = self._data.get(key)
+            if cached is None:
+                return None
+            if cached[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return cached[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def generation(self):
+        return self._generation
+
+    def incr_generation(self):
+        with self._lock:
+            self._generation += 1
+            # 旧版本的缓存不会再被访问，直接清空
+            self._data.clear()
+
+
+class _RedisBackend:
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def generation(self):
+        return int(self.client.get(self.prefix + "generation") or 0)
+
+    def incr_generation(self):
+        self.client.incr(self.prefix + "generation")
+
+
+class ResponseCache:
+    """
+    列表接口的响应缓存，以接口和请求参数为键，数据变化时通过递增版本号整体失效。
+    配置了可用的Redis时多个进程共享缓存，否则使用进程内缓存
+
+    @history_api.get('/list')
+    @response_cache.cached
+    def history_list(): ...
+
+    response_cache.invalidate()
+    """
+
+    def __init__(self, ttl=60, prefix="rs:response:"):
+        """
+        :param ttl: 缓存有效期(秒)，0表示不缓存
+        :param prefix: Redis键的前缀
+        """
+        self.ttl = ttl
+        self.prefix = prefix
+        self.backend = _MemoryBackend()
+
+    def init_app(self, app, ttl=None, use_redis=True):
+        if ttl is not None:
+            self.ttl = ttl
+        self.backend = _MemoryBackend()
+        if not use_redis or redis is None:
+            return
+        client = redis.Redis(
+            host=app.config.get("REDIS_HOST"),
+            port=app.config.get("REDIS_PORT"),
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5)
+        try:
+            client.ping()
+        except redis.RedisError:
+            app.logger.warning("Redis不可用，响应缓存使用进程内缓存")
+            return
+        self.backend = _RedisBackend(client, self.prefix)
+
+    def _key(self):
+        args = "&".join("{}={}".format(k, v)
+                        for k, v in sorted(request.args.items(multi=True)))
+        return "{}{}:{}:{}?{}".format(self.prefix,
+                                      self.backend.generation(),
+                                      request.endpoint, request.path, args)
+
+    def cached(self, func):
+        """缓存GET请求成功的JSON响应"""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.ttl or request.method != "GET":
+                return func(*args, **kwargs)
+            try:
+                key = self._key()
+                body = self.backend.get(key)
+            except Exception:
+                # 缓存出错时不影响接口本身
+                return func(*args, **kwargs)
+            if body is not None:
+                return Response(body, mimetype="application/json")
+            res = func(*args, **kwargs)
+            if isinstance(res, Response) and res.status_code == 200 \
+                    and res.is_json and res.get_json().get("success"):
+                try:
+                    self.backend.set(key, res.get_data(), self.ttl)
+                except Exception:
+                    pass
+            return res
+
+        return wrapper
+
+    def invalidate(self):
+        """分析记录增删后调用，使全部缓存失效"""
+        try:
+            self.backend.incr_generation()
+        except Exception:
+            pass
@@ -0,0 +1,30 @@
+import numpy as np
+from matplotlib import cm
+
+_luts = dict()
+
+
+def colormap_lut(name):
+    """
+    获取matplotlib色带对应的查找表
+    :param name: 色带名称，如plasma
+    :return: 256x3的uint8数组，按RGB顺序
+    """
+    lut = _luts.get(name)
+    if lut is None:
+        lut = getattr(cm, name)(np.arange(256), bytes=True)[:, :3]
+        _luts[name] = lut
+    return lut
+
+
+def normalize_index(gray):
+    """
+    与imshow相同，将灰度图按其最小值和最大值线性拉伸到色带的0~255索引
+    :param gray: 二维uint8数组
+    :return: 二维uint8索引数组
+    """
+    lo, hi = int(gray.min()), int(gray.max())
+    if hi == lo:
+        return np.zeros_like(gray, dtype=np.uint8)
+    index = (np.arange(256) - lo) * 256 // (hi - lo)
+    return np.clip(index, 0, 255).astype(np.uint8)[gray]
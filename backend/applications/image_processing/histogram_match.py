@@ -1,40 +1,45 @@
 import os.path as osp
+from functools import partial
 
 import cv2
 import numpy as np
 
 from applications.common.path_global import md5_name, generate_url
+from applications.extensions import executor
+
+
+def match_image(img, ref):
+    """将img的直方图匹配到ref"""
+    out = np.empty_like(img)
+    _, _, colorChannel = img.shape
+    for i in range(colorChannel):
+        hist_img, _ = np.histogram(img[:, :, i], 256)  # get the histogram
+        hist_ref, _ = np.histogram(ref[:, :, i], 256)
+        cdf_img = np.cumsum(hist_img)  # get the accumulative histogram
+        cdf_ref = np.cumsum(hist_ref)
+        # 每个灰度级映射到累计直方图差值最小的参考灰度级，差值相同时取较小的灰度级
+        lut = np.abs(cdf_img[:, None] - cdf_ref[None, :]).argmin(axis=1)
+        out[:, :, i] = lut.astype(img.dtype)[img[:, :, i]]
+    return out
+
+
+def match_file(data_dir, save_dir, pair):
+    """
+    :param pair: (包含first和second的图片名dict, 新图片名)
+    """
+    name, new_name = pair
+    img = cv2.imread(osp.join(data_dir, name["first"]))
+    ref = cv2.imread(osp.join(data_dir, name["second"]))
+    cv2.imwrite(osp.join(save_dir, new_name), match_image(img, ref))
+    return new_name
 
 
 def gram_match(
         names, data_dir, save_dir, flag=True
 ):  # DATA_DIR为第一时期图文件夹，Matched_dir为匹配的图片文件夹(第二时期)，save_dir为将储存结果放置的文件夹名称
     # names = list(map(osp.basename, glob(osp.join(DATA_DIR,'*.png'))))
-    print(names)
-    temps = list()
-    for name in names:
-        print("gram_match->" + str(name))
-        img = cv2.imread(osp.join(data_dir, name["first"]))
-        ref = cv2.imread(osp.join(data_dir, name["second"]))
-        out = np.zeros_like(img)
-        _, _, colorChannel = img.shape
-        for i in range(colorChannel):
-            hist_img, _ = np.histogram(img[:, :, i], 256)  # get the histogram
-            hist_ref, _ = np.histogram(ref[:, :, i], 256)
-            cdf_img = np.cumsum(hist_img)  # get the accumulative histogram
-            cdf_ref = np.cumsum(hist_ref)
-
-            for j in range(256):
-                tmp = abs(cdf_img[j] - cdf_ref)
-                tmp = tmp.tolist()
-                idx = tmp.index(
-                    min(tmp)
-                )  # find the smallest number in tmp, get the index of this number
-                out[:, :, i][img[:, :, i] == j] = idx
-        new_name = md5_name(str(name["first"]))
-        cv2.imwrite(osp.join(save_dir, new_name), out)
-        if flag:
-            temps.append(generate_url + new_name)
-        else:
-            temps.append(new_name)
+    pairs = [(name, md5_name(str(name["first"]))) for name in names]
+    temps = executor.map(partial(match_file, data_dir, save_dir), pairs)
+    if flag:
+        temps = [generate_url + new_name for new_name in temps]
     return temps
@@ -0,0 +1,29 @@
+import os.path as osp
+from functools import partial
+
+import cv2
+
+from applications.common.path_global import md5_name
+from applications.extensions import executor
+
+
+def process_file(src_dir, save_dir, func, names):
+    """
+    读取一张图片，处理后写入save_dir
+    :param names: (原图片名, 新图片名)
+    """
+    img = cv2.imread(osp.join(src_dir, names[0]))
+    cv2.imwrite(osp.join(save_dir, names[1]), func(img))
+    return names[1]
+
+
+def process_files(src_dir, save_dir, names, func):
+    """
+    使用共享的executor并行处理一批图片，每张图片读取、处理、写入。
+    新文件名在提交任务前生成，避免进程池中各子进程随机数状态相同导致重名，
+    其他向executor提交图片任务的地方也按此方式传入新文件名
+    :param func: 处理单张图像数组的函数，进程池模式下需可pickle
+    :return: 与names一一对应的新文件名列表
+    """
+    pairs = [(name, md5_name(name)) for name in names]
+    return executor.map(partial(process_file, src_dir, save_dir, func), pairs)
@@ -1,61 +1,58 @@
 import os.path as osp
 
 import cv2
-from PIL import Image
-from matplotlib import pyplot as plt
 
 from applications.common.path_global import md5_name, generate_url
+from applications.image_processing.colormap import colormap_lut, normalize_index
 
+# 渲染风格，依次为闪电、极光、森林、霓虹
+COLORMAPS = ("plasma", "viridis", "ocean", "rainbow")
 
-def show_images_in_row(
-        im_paths, fig, title='',
-        colormap=0):  # impaths为文件夹路径，colormap为渲染风格，可通过改变colormap的值来改变渲染风格
-    if colormap == 0:
-        map = plt.cm.plasma  # 闪电
-    if colormap == 1:
-        map = plt.cm.viridis  # 极光
-    if colormap == 2:
-        map = plt.cm.ocean  # 森林
-    if colormap == 3:
-        map = plt.cm.rainbow  # 霓虹
-    axs = fig.subplots(nrows=1, ncols=1)
-    axs.spines['top'].set_visible(False)
-    axs.spines['right'].set_visible(False)
-    axs.spines['bottom'].set_visible(False)
-    axs.spines['left'].set_visible(False)
-    axs.get_xaxis().set_ticks([])
-    axs.get_yaxis().set_ticks([])
-    im = cv2.imread(im_paths)
-    im = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
-    axs.imshow(im, cmap=map)
-
-
-def render(name, data_dir, save_dir,
-           colormap):  # 实现渲染的函数，考虑到我们的需要一次只能渲染一张，pic_source一样为图片位置
-    # 参考 https://stackoverflow.com/a/68209152
-    fig = plt.figure(constrained_layout=True)
-    subfigs = fig.subfigures(nrows=1, ncols=1)
-    # 读入变化图
-    pic_source = osp.join(data_dir, name)
-    show_images_in_row(
-        pic_source, subfigs, title='Change Map', colormap=colormap)
-
-    # 渲染结果
-    fig.canvas.draw()
-    Image.frombytes('RGB',
-                    fig.canvas.get_width_height(), fig.canvas.tostring_rgb())
+
+def render_array(gray, colormap=0):
+    """
+    使用色带查找表渲染变化图
+    :param gray: 二维uint8变化图
+    :param colormap: 渲染风格，为COLORMAPS的下标
+    :return: BGR顺序的uint8彩色图
+    """
+    lut = colormap_lut(COLORMAPS[colormap])[:, ::-1]
+    return lut[normalize_index(gray)]
+
+
+def render(name, data_dir, save_dir, colormap):  # 一次渲染一张，colormap为渲染风格
+    im = cv2.imread(osp.join(data_dir, name))
+    gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
     new_name = md5_name(str(colormap) + "_" + name)
-    plt.savefig(osp.join(save_dir, new_name), bbox_inches='tight')
+    cv2.imwrite(osp.join(save_dir, new_name), render_array(gray, colormap))
     return new_name
 
 
+def render_maps(gray, name, save_dir, prefix=""):
+    """
+    将同一张变化图渲染为全部风格
+    :param gray: 二维uint8变化图
+    :param name: 变化图文件名，用于生成结果文件名
+    :param save_dir: 结果保存路径
+    :param prefix: 结果链接中save_dir相对generate_url的子目录
+    :return: 渲染风格下标到结果链接的dict
+    """
+    index = normalize_index(gray)
+    maps = dict()
+    for i, colormap in enumerate(COLORMAPS):
+        new_name = md5_name(str(i) + "_" + name)
+        lut = colormap_lut(colormap)[:, ::-1]
+        cv2.imwrite(osp.join(save_dir, new_name), lut[index])
+        maps[i] = generate_url + (prefix + "/"
+                                  if prefix != "" else "") + new_name
+    return maps
+
+
 # 批量渲染
 def batch_render(data_dir, save_dir, imgs, prefix):
     temps = list()
     for img in imgs:
-        maps = dict()
-        for i in range(4):
-            maps[i] = generate_url + (prefix + "/" if prefix != "" else ""
-                                      ) + render(img, data_dir, save_dir, i)
-        temps.append(maps)
+        im = cv2.imread(osp.join(data_dir, img))
+        gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
+        temps.append(render_maps(gray, img, save_dir, prefix))
     return temps
@@ -1,66 +1,63 @@
 # 推理结果展示
-# 重复运行本单元可以查看不同结果
 import os.path as osp
 
+import cv2
 from PIL import Image
-from matplotlib import pyplot as plt
-from skimage.io import imread
 
 from applications.common.path_global import generate_url, md5_name
-
-
-def show_images_in_row(
-        im_paths, fig, title='',
-        colormap=0):  # impaths为文件夹路径，colormap为渲染风格，可通过改变colormap的值来改变渲染风格
-    if colormap == 0:
-        map = plt.cm.hot  # 熔岩
-    if colormap == 1:
-        map = plt.cm.summer  # 田野
-    if colormap == 2:
-        map = plt.cm.winter  # 海洋
-    if colormap == 3:
-        map = plt.cm.Wistia  # 沙漠
-    # fig.suptitle(title)
-    axs = fig.subplots(nrows=1, ncols=1)
-    axs.spines['top'].set_visible(False)
-    axs.spines['right'].set_visible(False)
-    axs.spines['bottom'].set_visible(False)
-    axs.spines['left'].set_visible(False)
-    axs.get_xaxis().set_ticks([])
-    axs.get_yaxis().set_ticks([])
-
-    im = imread(im_paths)
-    axs.imshow(im, cmap=map)
-
-
-def render_seg(name, data_dir, save_dir,
-               colormap):  # 实现渲染的函数，考虑到我们的需要一次只能渲染一张，pic_source一样为图片位置
-    # 参考 https://stackoverflow.com/a/68209152
-    fig = plt.figure(constrained_layout=True)
-    # fig.suptitle("")   设置标题用的，我们不用设置标题，因为下面已经设置了
-    subfigs = fig.subfigures(nrows=1, ncols=1)
-    # 读入变化图
-    pic_source = osp.join(data_dir, name)
-    show_images_in_row(
-        pic_source, subfigs, title='Change Map',
-        colormap=colormap)  # title为changemap，换成中文会乱码，勿换
-
-    # 渲染结果
-    fig.canvas.draw()
-    Image.frombytes('RGB',
-                    fig.canvas.get_width_height(), fig.canvas.tostring_rgb())
-    # plt.show()
+from applications.image_processing.colormap import colormap_lut, normalize_index
+
+# 渲染风格，依次为熔岩、田野、海洋、沙漠
+COLORMAPS = ("hot", "summer", "winter", "Wistia")
+
+
+def save_indexed(path, index, lut, palette=True):
+    """
+    保存按色带查找表着色的索引图
+    :param index: 二维uint8索引数组
+    :param lut: 256x3的RGB查找表
+    :param palette: 为True且保存为png时写入8位调色板图，否则写入RGB图
+    """
+    if palette and osp.splitext(path)[1].lower() == ".png":
+        im = Image.fromarray(index)  # putpalette会将L模式转为P模式
+        im.putpalette(lut.flatten().tolist())
+        im.save(path, optimize=False)
+    else:
+        cv2.imwrite(path, lut[:, ::-1][index])
+
+
+def render_seg(name, data_dir, save_dir, colormap,
+               palette=True):  # 一次渲染一张，colormap为渲染风格
+    label_map = cv2.imread(osp.join(data_dir, name), cv2.IMREAD_GRAYSCALE)
     new_name = md5_name(str(colormap) + "_" + name)
-    plt.savefig(osp.join(save_dir, new_name), bbox_inches='tight')
+    save_indexed(
+        osp.join(save_dir, new_name),
+        normalize_index(label_map),
+        colormap_lut(COLORMAPS[colormap]),
+        palette=palette)
     return new_name
 
 
 # 批量渲染
-def batch_render_seg(data_dir, save_dir, imgs):
+def batch_render_seg(data_dir, save_dir, imgs, palette=True):
+    """
+    将分割结果渲染为全部风格，每张图只解码一次，结果尺寸与原图一致
+    :param imgs: 单通道的原始类别标签图，不能是着色后的结果图：
+                 不同类别的颜色转为灰度后可能相同，无法还原类别
+    :param palette: 是否将png结果保存为8位调色板图
+    """
     temps = list()
     for img in imgs:
+        label_map = cv2.imread(osp.join(data_dir, img), cv2.IMREAD_GRAYSCALE)
+        index = normalize_index(label_map)
         maps = dict()
-        for i in range(4):
-            maps[i] = generate_url + render_seg(img, data_dir, save_dir, i)
+        for i, colormap in enumerate(COLORMAPS):
+            new_name = md5_name(str(i) + "_" + img)
+            save_indexed(
+                osp.join(save_dir, new_name),
+                index,
+                colormap_lut(colormap),
+                palette=palette)
+            maps[i] = generate_url + new_name
         temps.append(maps)
     return temps
@@ -1,27 +1,26 @@
-import os.path as osp
+from functools import partial
 
 import cv2
 
-from applications.common.path_global import md5_name
+from applications.image_processing.image_io import process_files
+
+
+def resize_image(img, mode=0):
+    if mode == 0:
+        img = cv2.resize(img, (1024, 1024))  # 变化检测选0
+    if mode == 1:
+        img = cv2.resize(img, (1500, 1500))  # 目标提取选1
+    if mode == 2:
+        img = cv2.resize(img, (512, 512))  # 地物分类选2
+    if mode == 3:
+        img = cv2.resize(img, (608, 608))
+    return img
 
 
 def resize(src_dir, save_dir, names,
            mode=0):  # 改变mode的值选择不同的resize方式，目标检测不用resize,直接把图丢进去就行
-    temps = list()
-    for name in names:
-        img = cv2.imread(osp.join(src_dir, name))
-        if mode == 0:
-            img = cv2.resize(img, (1024, 1024))  # 变化检测选0
-        if mode == 1:
-            img = cv2.resize(img, (1500, 1500))  # 目标提取选1
-        if mode == 2:
-            img = cv2.resize(img, (512, 512))  # 地物分类选2
-        if mode == 3:
-            img = cv2.resize(img, (608, 608))
-        new_name = md5_name(name)
-        cv2.imwrite(osp.join(save_dir, new_name), img)
-        temps.append(new_name)
-    return temps
+    return process_files(src_dir, save_dir, names,
+                         partial(resize_image, mode=mode))
 
 
 # Resize(r'D:\pictest\after',r'D:\pictest\resize',mode=2)    #测试
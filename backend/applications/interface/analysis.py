@@ -1,39 +1,40 @@
 import copy
 import json
-import os
+import os.path as osp
+from functools import partial
 
 import cv2
 
 from applications.common.path_global import fun_type_1, fun_type_2, fun_type_3, fun_type_4, fun_type_5, \
-    fun_type_6, fun_type_7, generate_url, fun_type_8, up_url, generate_dir
+    fun_type_6, generate_url, fun_type_8, up_url, generate_dir, content_name, md5_name
 from applications.common.utils.upload import img_url_handle
-from applications.extensions import db
+from applications.extensions import db, artifact_cache, response_cache, metrics, executor
+from applications.extensions.init_sqlalchemy import clear_count_cache
 from applications.image_processing import histogram_match
-from applications.image_processing.CLAHE import CLAHE
-from applications.image_processing.gaussian_blur import gaussian_blur
+from applications.image_processing.CLAHE import CLAHE, clahe_image
+from applications.image_processing.gaussian_blur import gaussian_blur, gaussian_blur_image
 from applications.image_processing.hole import hole_fill
-from applications.image_processing.median_blur import median_blur
+from applications.image_processing.median_blur import median_blur, median_blur_image
 from applications.image_processing.render import batch_render
-from applications.image_processing.render_seg import batch_render_seg
-from applications.image_processing.resize import resize
-from applications.image_processing.sharpen import sharpen
+from applications.image_processing.resize import resize_image
+from applications.image_processing.sharpen import sharpen, sharpen_image
 from applications.interface import change_detection as CD
 from applications.interface import classification as C
 from applications.interface import object_detection as OD
 from applications.interface import semantic_segmentation as SS
 from applications.interface import image_restoration as IR
-from applications.interface.compute_variation import compute_variation
-from applications.interface.draw_mask import draw_masks
+from applications.interface.change_analytics import analyze_change_map
 from applications.models.analysis import Analysis
 
 
-def save_analysis(type_,
-                  pic1,
-                  retPic,
-                  pic2="",
-                  data="{}",
-                  is_hole=False,
-                  checked="0,0"):
+def new_analysis(type_,
+                 pic1,
+                 retPic,
+                 pic2="",
+                 data="{}",
+                 is_hole=False,
+                 checked="0,0"):
+    """构建一条分析记录，不写入数据库"""
     analysis = Analysis()
 
     analysis.type = type_
@@ -43,10 +44,51 @@ def save_analysis(type_,
     analysis.data = data
     analysis.is_hole = is_hole
     analysis.checked = checked
-    db.session.add(analysis)
-    db.session.commit()
+    return analysis
+
+
+def save_analyses(analyses):
+    """
+    在一个事务中批量写入一次请求产生的分析记录
+    :param analyses: new_analysis构建的记录列表
+    :return: 新增记录的id列表
+    """
+    if not analyses:
+        return []
+    try:
+        with metrics.timer("db_write"):
+            db.session.add_all(analyses)
+            db.session.flush()
+            ids = [analysis.id for analysis in analyses]
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    clear_count_cache()
+    response_cache.invalidate()
+    return ids
+
+
+def save_analysis(type_,
+                  pic1,
+                  retPic,
+                  pic2="",
+                  data="{}",
+                  is_hole=False,
+                  checked="0,0"):
+    return save_analyses([
+        new_analysis(
+            type_,
+            pic1,
+            retPic,
+            pic2=pic2,
+            data=data,
+            is_hole=is_hole,
+            checked=checked)
+    ])[0]
 
 
+@metrics.task("change_detection")
 def change_detection(model_path,
                      data_path,
                      out_dir,
@@ -55,7 +97,8 @@ def change_detection(model_path,
                      step2,
                      type_,
                      window_size=256,
-                     stride=128):
+                     stride=128,
+                     progress=None):
     """
     变化检测
     :param model_path: 静态图模型路径
@@ -63,7 +106,8 @@ def change_detection(model_path,
     :param out_dir:图片保存路径
     :param window_size:滑窗大小
     :param stride:步长
-    :return:
+    :param progress:进度回调，每对影像每完成一个阶段调用一次，阶段数见PROGRESS_STAGES
+    :return: 新增的分析记录id列表
     """
     print("变化检测----------------->start")
     imgs = list()
@@ -75,21 +119,15 @@ def change_detection(model_path,
         imgs.append(pair["first"])
         imgs1.append(pair["second"])
 
-    # 1.直图or锐化
-    if step1 != 0:
-        if step1 == fun_type_1:
-            imgs = handle(step1, names, data_path, data_path)
-        else:
-            imgs = handle(step1, imgs, data_path, data_path)
-            imgs1 = handle(step1, imgs1, data_path, data_path)
-    # 2.平滑or滤波
-    if step2 != 0:
-        imgs = handle(step2, imgs, data_path, data_path)
-        imgs1 = handle(step2, imgs1, data_path, data_path)
-
-    # 3.resize
-    resizes = resize(data_path, data_path, imgs, mode=0)
-    resizes1 = resize(data_path, data_path, imgs1, mode=0)
+    # 1.预处理，每对图片在executor中独立完成，只将resize后的最终输入写入磁盘
+    with metrics.timer("preprocess"):
+        res = executor.map(
+            partial(preprocess_pair, data_path, step1, step2),
+            [((first, md5_name(first)), (second, md5_name(second)))
+             for first, second in zip(imgs, imgs1)],
+            callback=progress)
+    resizes = [r[0] for r in res]
+    resizes1 = [r[1] for r in res]
     i = 0
     for pair in names:
         pair["first"] = resizes[i]
@@ -102,55 +140,95 @@ def change_detection(model_path,
         out_dir,
         names,
         window_size=window_size,
-        stride=stride)
-    # 4.检测渲染
-    res = handle(fun_type_6, filenames, out_dir, out_dir)
+        stride=stride,
+        progress=progress)
+    # 4.变化图分析，一次解码完成渲染、轮廓掩膜、变化率与孔洞填充
+    datas = list()
+    for data, recorded in executor.map(
+            partial(analyze_file, out_dir),
+            [(filename, md5_name(filename)) for filename in filenames],
+            callback=progress):
+        metrics.replay(recorded)
+        datas.append(data)
     # 5.入库
+    analyses = list()
     i = 0
     for pair in temp_names:
         # first_ = pair["first"]
         first_ = up_url + resizes[i]
         second_ = pair['second']
         retPic = retPics[i]
-        mask, count = draw_masks(os.path.join(out_dir, filenames[i]))
-        cv2.imwrite(
-            os.path.join(out_dir,
-                         os.path.splitext(filenames[i])[0] + "_mask.png"), mask)
-        res[i]["mask"] = out_dir + os.path.splitext(filenames[i])[
-            0] + "_mask.png"
-        res[i]["count"] = count
-        res[i]["fractional_variation"] = compute_variation(
-            os.path.join(out_dir, filenames[i]))
-        after_img, data = hole_handle(out_dir, out_dir + "hole/", [retPic])
-        res[i]["hole"] = after_img
-        res[i]["hole_style"] = handle(
-            fun_type_6, [os.path.basename(after_img)],
-            out_dir + "hole/",
-            out_dir + "hole/",
-            prefix="hole")[0]
-        mask, count = draw_masks(
-            os.path.join(out_dir + "hole/", os.path.basename(after_img)))
-        cv2.imwrite(
-            os.path.join(
-                out_dir + "hole/",
-                os.path.splitext(os.path.basename(after_img))[0] + "_mask.png"),
-            mask)
-        res[i]["mask_hole"] = out_dir + "hole/" + os.path.splitext(
-            os.path.basename(after_img))[0] + "_mask.png"
-        res[i]["count_hole"] = count
-        res[i]["fractional_variation_hole"] = compute_variation(
-            os.path.join(generate_dir + "hole/", os.path.basename(after_img)))
-        data = json.dumps(res[i])
-        save_analysis(
-            type_,
-            first_,
-            retPic,
-            pic2=second_,
-            data=data,
-            checked=str(step1) + "," + str(step2),
-            is_hole=True)
+        data = json.dumps(datas[i])
+        analyses.append(
+            new_analysis(
+                type_,
+                first_,
+                retPic,
+                pic2=second_,
+                data=data,
+                checked=str(step1) + "," + str(step2),
+                is_hole=True))
         i += 1
+    ids = save_analyses(analyses)
     print("变化检测----------------->end")
+    return ids
+
+
+@metrics.task("tiled_change_detection")
+def tiled_change_detection(model_path,
+                           data_path,
+                           out_dir,
+                           names,
+                           type_,
+                           window_size=256,
+                           stride=128,
+                           progress=None):
+    """
+    大幅影像变化检测，不做预处理和resize，按窗口流式读取原始影像并推理，
+    结果保存为保留地理参考的GeoTIFF，变化图分析使用降采样的预览图
+    :param model_path: 静态图模型路径
+    :param data_path: 图片数据路径
+    :param out_dir: 图片保存路径
+    :param window_size: 滑窗大小
+    :param stride: 步长
+    :param progress: 进度回调，每对影像每完成一个阶段调用一次，阶段数见PROGRESS_STAGES
+    :return: 新增的分析记录id列表
+    """
+    print("分块变化检测----------------->start")
+    for pair in names:
+        pair["first"] = img_url_handle(pair["first"])
+        pair['second'] = img_url_handle(pair['second'])
+    tifs, previews = CD.tiled_execute(
+        model_path,
+        data_path,
+        out_dir,
+        names,
+        window_size=window_size,
+        stride=stride,
+        progress=progress)
+    analyses = list()
+    for i, pair in enumerate(names):
+        # 原始GeoTIFF无法在浏览器中显示，两期影像都保存png预览图用于展示
+        first_ = up_url + CD.gdal_preview(
+            osp.join(data_path, pair["first"]), data_path, pair["first"])
+        second_ = up_url + CD.gdal_preview(
+            osp.join(data_path, pair["second"]), data_path, pair["second"])
+        data = analyze_change_map(out_dir, previews[i])
+        data["geotiff"] = tifs[i]
+        analyses.append(
+            new_analysis(
+                type_,
+                first_,
+                generate_url + previews[i],
+                pic2=second_,
+                data=json.dumps(data),
+                checked="0,0",
+                is_hole=True))
+        if progress:
+            progress()
+    ids = save_analyses(analyses)
+    print("分块变化检测----------------->end")
+    return ids
 
 
 def hole_handle(data_path, out_dir, names):
@@ -169,14 +247,22 @@ def url_handle(imgs):
         j += 1
 
 
-def object_detection(model_path, data_path, out_dir, names, step1, step2,
-                     type_):
+@metrics.task("object_detection")
+def object_detection(model_path,
+                     data_path,
+                     out_dir,
+                     names,
+                     step1,
+                     step2,
+                     type_,
+                     progress=None):
     """
     目标检测
     :param model_path:
     :param data_path:
     :param out_dir:
-    :return:
+    :param progress:进度回调，每张图片每完成一个阶段调用一次，阶段数见PROGRESS_STAGES
+    :return: 新增的分析记录id列表
     """
     print("目标检测----------------->start")
     imgs = list()
@@ -185,42 +271,52 @@ def object_detection(model_path, data_path, out_dir, names, step1, step2,
         names[j] = img_url_handle(pair)
         imgs.append(names[j])
 
-    # 3.resize
-    resizes = resize(data_path, data_path, imgs, mode=3)
-    for i, pair in enumerate(imgs):
-        imgs[i] = resizes[i]
-
-    # 1.CLAHE or 锐化
-    if step1 != 0:
-        imgs = handle(step1, imgs, data_path, data_path)
-    # 2.平滑or滤波
-    if step2 != 0:
-        imgs = handle(step2, imgs, data_path, data_path)
+    # 3.resize与预处理，每张图片在executor中独立完成
+    with metrics.timer("preprocess"):
+        res = executor.map(
+            partial(preprocess_image, data_path, step1, step2, 3),
+            [(name, md5_name(name), md5_name(name)) for name in imgs],
+            callback=progress)
+    resizes = [r[0] for r in res]
+    inputs = [r[1] for r in res]
 
     # 4. 目标检测
-    retPics = OD.execute(model_path, data_path, out_dir, imgs)
+    retPics = OD.execute(
+        model_path, data_path, out_dir, inputs, progress=progress)
     # 5.入库
+    analyses = list()
     for i, pair in enumerate(resizes):
         first_ = up_url + pair
         retPic = retPics[i]
-        save_analysis(
-            type_,
-            first_,
-            retPic,
-            pic2="",
-            data="",
-            checked=str(step1) + "," + str(step2))
+        analyses.append(
+            new_analysis(
+                type_,
+                first_,
+                retPic,
+                pic2="",
+                data="",
+                checked=str(step1) + "," + str(step2)))
+    ids = save_analyses(analyses)
     print("目标检测----------------->end")
+    return ids
 
 
-def terrain_classification(model_path, data_path, out_dir, names, step1, step2,
-                           type_):
+@metrics.task("terrain_classification")
+def terrain_classification(model_path,
+                           data_path,
+                           out_dir,
+                           names,
+                           step1,
+                           step2,
+                           type_,
+                           progress=None):
     """
     地物分类
     :param model_path:
     :param data_path:
     :param out_dir:
-    :return:
+    :param progress:进度回调，每张图片每完成一个阶段调用一次，阶段数见PROGRESS_STAGES
+    :return: 新增的分析记录id列表
     """
     print("地物分类----------------->start")
     imgs = list()
@@ -228,42 +324,46 @@ def terrain_classification(model_path, data_path, out_dir, names, step1, step2,
     for j, pair in enumerate(names):
         names[j] = img_url_handle(pair)
         imgs.append(names[j])
-    # 3.resize
-    resizes = resize(data_path, data_path, imgs, mode=2)
-    for i, pair in enumerate(imgs):
-        imgs[i] = resizes[i]
-
-    # 1.CLAHE or 锐化
-    if step1 != 0:
-        imgs = handle(step1, imgs, data_path, data_path)
-    # 2.平滑or滤波
-    if step2 != 0:
-        imgs = handle(step2, imgs, data_path, data_path)
+    # 3.resize与预处理，每张图片在executor中独立完成
+    with metrics.timer("preprocess"):
+        res = executor.map(
+            partial(preprocess_image, data_path, step1, step2, 2),
+            [(name, md5_name(name), md5_name(name)) for name in imgs],
+            callback=progress)
+    resizes = [r[0] for r in res]
+    inputs = [r[1] for r in res]
 
     # 4. 地物分类
-    retPics = SS.execute(model_path, data_path, out_dir, imgs)
+    retPics = SS.execute(
+        model_path, data_path, out_dir, inputs, progress=progress)
     # 5.入库
+    analyses = list()
     for i, pair in enumerate(resizes):
         first_ = up_url + pair
         retPic = retPics[i]
-        save_analysis(
-            type_,
-            first_,
-            retPic,
-            pic2="",
-            data="",
-            checked=str(step1) + "," + str(step2))
+        analyses.append(
+            new_analysis(
+                type_,
+                first_,
+                retPic,
+                pic2="",
+                data="",
+                checked=str(step1) + "," + str(step2)))
+    ids = save_analyses(analyses)
     print("地物分类----------------->end")
+    return ids
 
 
-def classification(model_path, data_path, names, type):
+@metrics.task("classification")
+def classification(model_path, data_path, names, type, progress=None):
     """
     场景分类
     :param model_path: 模型存储目录
     :param data_path: 待推理图片存储目录
     :param names: 待推理图片列表
     :param type: 功能类别
-    :return:
+    :param progress:进度回调，每张图片每完成一个阶段调用一次，阶段数见PROGRESS_STAGES
+    :return: 新增的分析记录id列表
     """
     print("场景分类----------------->start")
     imgs = list()
@@ -271,24 +371,35 @@ def classification(model_path, data_path, names, type):
         names[j] = img_url_handle(pair)
         imgs.append(names[j])
     # 1. 场景分类
-    result = C.execute(model_path, data_path, imgs)
+    result = C.execute(model_path, data_path, imgs, progress=progress)
     # 2.入库
+    analyses = list()
     for i, pair in enumerate(names):
         first_ = up_url + pair
         ret = {}
         for j in range(0, len(result[i]["label_names_map"])):
             ret[result[i]["label_names_map"][j]] = result[i]["scores_map"][j]
-        save_analysis(type, first_, "", pic2="", data=json.dumps(ret))
+        analyses.append(
+            new_analysis(type, first_, "", pic2="", data=json.dumps(ret)))
+    ids = save_analyses(analyses)
     print("场景分类----------------->end")
+    return ids
 
 
-def image_restoration(model_path, data_path, out_dir, names, type_):
+@metrics.task("image_restoration")
+def image_restoration(model_path,
+                      data_path,
+                      out_dir,
+                      names,
+                      type_,
+                      progress=None):
     """
     图像复原
     :param model_path:
     :param data_path:
     :param out_dir:
-    :return:
+    :param progress:进度回调，每张图片每完成一个阶段调用一次，阶段数见PROGRESS_STAGES
+    :return: 新增的分析记录id列表
     """
     print("图像复原----------------->start")
     imgs = list()
@@ -297,13 +408,155 @@ def image_restoration(model_path, data_path, out_dir, names, type_):
         imgs.append(names[j])
 
     # 1. 图像复原
-    retPics = IR.execute(model_path, data_path, out_dir, imgs)
+    retPics = IR.execute(
+        model_path, data_path, out_dir, imgs, progress=progress)
     # 2.入库
+    analyses = list()
     for i, pair in enumerate(names):
         first_ = up_url + pair
         retPic = retPics[i]
-        save_analysis(type_, first_, retPic, pic2="", data="")
+        analyses.append(new_analysis(type_, first_, retPic, pic2="", data=""))
+    ids = save_analyses(analyses)
     print("图像复原----------------->end")
+    return ids
+
+
+# 各流程中每张图片(变化检测为每对影像)依次完成的阶段数，任务总进度为图片数×阶段数
+PROGRESS_STAGES = {
+    change_detection: 3,  # 预处理、推理、变化图分析
+    tiled_change_detection: 2,  # 分块推理、预览与变化图分析
+    object_detection: 2,  # 预处理、推理与绘制
+    terrain_classification: 2,  # 预处理、推理与着色
+    classification: 1,  # 推理
+    image_restoration: 1  # 推理与保存
+}
+
+
+def handle_image(fun_type, img, ref=None):
+    """
+    与handle相同的预处理，直接处理内存中的图像数组，不读写磁盘
+    :param fun_type: 1=直方图匹配，2=CLAHE，3=中值滤波，4=锐化，5=高斯滤波
+    :param img: 图像数组
+    :param ref: 直方图匹配的参考图像数组
+    :return: 处理后的图像数组
+    """
+    if fun_type == fun_type_1:
+        return histogram_match.match_image(img, ref)
+    funcs = {
+        fun_type_2: clahe_image,
+        fun_type_3: median_blur_image,
+        fun_type_4: sharpen_image,
+        fun_type_5: gaussian_blur_image
+    }
+    return funcs[fun_type](img)
+
+
+def preprocess_pair(data_path, step1, step2, names):
+    """
+    变化检测一对图片的预处理：读取→step1→step2→resize→写入，
+    一次只在内存中保留这一对图片
+    :param names: ((第一时相图片名, 新图片名), (第二时相图片名, 新图片名))
+    :return: 两期resize后的新图片名
+    """
+    first, second = names
+    im = cv2.imread(osp.join(data_path, first[0]))
+    im1 = cv2.imread(osp.join(data_path, second[0]))
+    # 1.直图or锐化
+    if step1 != 0:
+        if step1 == fun_type_1:
+            im = handle_image(step1, im, im1)
+        else:
+            im = handle_image(step1, im)
+            im1 = handle_image(step1, im1)
+    # 2.平滑or滤波
+    if step2 != 0:
+        im = handle_image(step2, im)
+        im1 = handle_image(step2, im1)
+    # 3.resize
+    cv2.imwrite(osp.join(data_path, first[1]), resize_image(im, mode=0))
+    cv2.imwrite(osp.join(data_path, second[1]), resize_image(im1, mode=0))
+    return first[1], second[1]
+
+
+def preprocess_image(data_path, step1, step2, mode, names):
+    """
+    目标检测与地物分类单张图片的预处理：读取→resize→写入→step1→step2→写入
+    :param mode: resize_image的mode
+    :param names: (原图片名, resize结果的新图片名, 预处理结果的新图片名)
+    :return: resize结果与模型输入的图片名，未做预处理时两者相同
+    """
+    im = resize_image(cv2.imread(osp.join(data_path, names[0])), mode=mode)
+    cv2.imwrite(osp.join(data_path, names[1]), im)
+    if step1 == 0 and step2 == 0:
+        return names[1], names[1]
+    # 1.CLAHE or 锐化
+    if step1 != 0:
+        im = handle_image(step1, im)
+    # 2.平滑or滤波
+    if step2 != 0:
+        im = handle_image(step2, im)
+    cv2.imwrite(osp.join(data_path, names[2]), im)
+    return names[1], names[2]
+
+
+def analyze_file(out_dir, names):
+    """
+    在executor中执行analyze_change_map
+    :param names: (变化图文件名, 孔洞填充结果的文件名)
+    :return: analyze_change_map的结果与暂存的指标，指标由调用方用metrics.replay写入
+    """
+    with metrics.recording() as recorded:
+        res = analyze_change_map(out_dir, *names)
+    return res, recorded
+
+
+def preprocess_file(src_dir, fun_type, names):
+    """
+    读取一张图片，按fun_type预处理后写入指定路径
+    :param names: (图片名, 直方图匹配的参考图片名或None, 输出路径)
+    """
+    img = cv2.imread(osp.join(src_dir, names[0]))
+    ref = cv2.imread(osp.join(src_dir, names[1])) if names[1] else None
+    cv2.imwrite(names[2], handle_image(fun_type, img, ref))
+    return names[2]
+
+
+def cached_handle(fun_type, imgs, src_dir, refs=None):
+    """
+    与handle_image相同的预处理，结果按(输入内容摘要, 操作)写入缓存目录，
+    相同图片重复预处理时直接返回已有结果
+    :param fun_type: 同handle_image
+    :param imgs: 图片名列表
+    :param src_dir: 图片所在目录
+    :param refs: 直方图匹配的参考图片名列表，与imgs一一对应
+    :return: 相对generate_dir的结果文件名列表
+    """
+    cache_names = list()
+    misses = dict()
+    for i, name in enumerate(imgs):
+        path = osp.join(src_dir, name)
+        keys = [fun_type, artifact_cache.file_digest(path)]
+        ref = refs[i] if refs is not None else None
+        if ref is not None:
+            keys.append(artifact_cache.file_digest(osp.join(src_dir, ref)))
+        cache_name = content_name(name, *keys)
+        cache_names.append(cache_name)
+        if cache_name not in misses and artifact_cache.get(cache_name) is None:
+            misses[cache_name] = (name, ref,
+                                  artifact_cache.temp_path(cache_name))
+    # 未命中的图片在共享的executor中并行处理，写入临时文件后再加入缓存
+    executor.map(
+        partial(preprocess_file, src_dir, fun_type), list(misses.values()))
+    added = {
+        cache_name: artifact_cache.add(cache_name, miss[2])
+        for cache_name, miss in misses.items()
+    }
+    temps = list()
+    for cache_name in cache_names:
+        cache_path = added.get(cache_name) or artifact_cache.path(cache_name)
+        temps.append(
+            osp.relpath(cache_path, generate_dir).replace(osp.sep, "/"))
+    return temps
 
 
 def handle(fun_type, imgs, src_dir, save_dir, prefix=""):
@@ -324,7 +577,6 @@ def handle(fun_type, imgs, src_dir, save_dir, prefix=""):
             4=锐化，
             5=高斯滤波
             6=变化检测渲染，
-            7=目标提取渲染，
             8=孔洞填充(用于变化检测结果图处理)
     """
     temps = list()
@@ -341,8 +593,6 @@ def handle(fun_type, imgs, src_dir, save_dir, prefix=""):
         temps = gaussian_blur(src_dir, save_dir, imgs)
     elif fun_type == fun_type_6:
         temps = batch_render(src_dir, save_dir, imgs, prefix)
-    elif fun_type == fun_type_7:
-        temps = batch_render_seg(src_dir, save_dir, imgs)
     elif fun_type == fun_type_8:
         temps = hole_fill(src_dir, save_dir, imgs)
     return temps
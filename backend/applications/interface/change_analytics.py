@@ -0,0 +1,53 @@
+import os.path as osp
+
+import cv2
+
+from applications.common.path_global import md5_name, generate_url
+from applications.extensions import metrics
+from applications.image_processing.hole import hole_fill_array
+from applications.image_processing.render import render_maps
+from applications.interface.compute_variation import compute_variation_array
+from applications.interface.draw_mask import draw_masks_array
+
+
+def _mask_stats(gray, save_dir, name):
+    """保存轮廓掩膜，返回掩膜路径、变化区域个数与变化率"""
+    ret, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    mask, count = draw_masks_array(binary)
+    mask_path = save_dir + osp.splitext(name)[0] + "_mask.png"
+    cv2.imwrite(mask_path, mask)
+    return mask_path, count, compute_variation_array(gray), binary
+
+
+def analyze_change_map(out_dir, filename, hole_name=None):
+    """
+    变化图分析，只解码一次变化图，依次得到渲染图、轮廓掩膜、变化区域个数、变化率，
+    以及孔洞填充后的变化图和它的上述结果
+    :param out_dir: 变化图所在路径，孔洞填充结果保存在其hole子目录
+    :param filename: 变化图文件名
+    :param hole_name: 孔洞填充结果的文件名，默认随机生成
+    :return: 入库data字段的dict
+    """
+    img = cv2.imread(osp.join(out_dir, filename))
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # 1.检测渲染
+    with metrics.timer("render"):
+        res = render_maps(gray, filename, out_dir)
+    # 2.轮廓掩膜与变化率
+    with metrics.timer("mask"):
+        res["mask"], res["count"], res["fractional_variation"], binary = \
+            _mask_stats(gray, out_dir, filename)
+    # 3.孔洞处理
+    hole_dir = out_dir + "hole/"
+    with metrics.timer("hole_fill"):
+        hole = hole_fill_array(binary)
+        hole_name = hole_name or md5_name(filename)
+        cv2.imwrite(osp.join(hole_dir, hole_name), hole)
+    res["hole"] = generate_url + "hole/" + hole_name
+    with metrics.timer("render"):
+        res["hole_style"] = render_maps(
+            hole, hole_name, hole_dir, prefix="hole")
+    with metrics.timer("mask"):
+        res["mask_hole"], res["count_hole"], res["fractional_variation_hole"], _ = \
+            _mask_stats(hole, hole_dir, hole_name)
+    return res
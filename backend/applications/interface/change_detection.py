@@ -1,37 +1,217 @@
-import os
 import os.path as osp
 
+import cv2
 import numpy as np
-from skimage.io import imsave
+from flask import current_app
 
-import paddlers as pdrs
 from paddlers.transforms import decode_image
 
-from applications.common.path_global import generate_url
+try:
+    from osgeo import gdal
+except ImportError:
+    import gdal
 
+from applications.common.path_global import generate_url, md5_name
+from applications.extensions import predictor_cache, metrics
 
-def execute(model_path, data_path, out_dir, names, window_size=256, stride=128):
-    image_list = [(osp.join(data_path, name["first"]), osp.join(data_path,
-                                                                name["second"]))
-                  for name in names]
+
+def window_starts(size, block_size, stride):
+    """计算滑窗在一个方向上的起点，最后一个窗口与图像边缘对齐"""
+    if size <= block_size:
+        return [0]
+    starts = list(range(0, size - block_size, stride))
+    starts.append(size - block_size)
+    return starts
+
+
+def slider_predict(predictor, im1, im2, block_size=256, overlap=128):
+    """
+    在内存中进行滑窗推理，重叠区域按accum策略累加各窗口的概率图
+    :param predictor: 变化检测Predictor
+    :param im1: 第一时相影像
+    :param im2: 第二时相影像
+    :param block_size: 滑窗大小
+    :param overlap: 相邻窗口的重叠像素数
+    :return: 二维标签图
+    """
+    h, w = im1.shape[:2]
+    block_h, block_w = min(block_size, h), min(block_size, w)
+    stride = block_size - overlap
+    prob = None
+    for y in window_starts(h, block_h, stride):
+        xs = window_starts(w, block_w, stride)
+        # 同一行的窗口作为一个batch推理
+        tiles = [(im1[y:y + block_h, x:x + block_w],
+                  im2[y:y + block_h, x:x + block_w]) for x in xs]
+        with metrics.timer("inference"):
+            preds = predictor.predict(tiles)
+        for x, pred in zip(xs, preds):
+            score_map = pred['score_map']
+            if prob is None:
+                prob = np.zeros((h, w, score_map.shape[-1]), dtype=np.float32)
+            prob[y:y + block_h, x:x + block_w] += score_map
+    return np.argmax(prob, axis=-1)
+
+
+def execute(model_path,
+            data_path,
+            out_dir,
+            names,
+            window_size=256,
+            stride=128,
+            progress=None):
+    """
+    :param progress: 每完成一对影像的推理调用一次的回调
+    """
     temps = list()  # 存储查看链接
     temps1 = list()  # 存储生成的图片名
-    predictor = pdrs.deploy.Predictor(model_path, use_gpu=True)
-    for image in image_list:
-        predictor.slider_predict(
-            image,
-            save_dir=out_dir,
-            transforms=None,
-            block_size=window_size,  #注意block_size的值不能等于overlap的值
-            overlap=window_size - stride,
-            merge_strategy='accum')
-    for name in names:
-        raw_name = os.path.splitext(name["first"])[0] + ".tif"
-        img = decode_image(osp.join(out_dir, raw_name))
-        save_img = np.where(img == 0, img, 255)
-        save_img = np.concatenate((save_img, save_img, save_img), axis=-1)
-        imsave(osp.join(out_dir, name["first"]), save_img)
-        temps.append(generate_url + name["first"])
-        temps1.append(name["first"])
-        os.remove(osp.join(out_dir, raw_name))
+    with predictor_cache.acquire(model_path, use_gpu=True) as predictor:
+        for name in names:
+            im1 = decode_image(osp.join(data_path, name["first"]))
+            im2 = decode_image(osp.join(data_path, name["second"]))
+            label_map = slider_predict(
+                predictor,
+                im1,
+                im2,
+                block_size=window_size,  #注意block_size的值不能等于overlap的值
+                overlap=window_size - stride)
+            # 变化区域为255，未变化区域为0，保存为单通道png
+            save_img = np.where(label_map == 0, 0, 255).astype(np.uint8)
+            cv2.imwrite(osp.join(out_dir, name["first"]), save_img)
+            temps.append(generate_url + name["first"])
+            temps1.append(name["first"])
+            if progress:
+                progress()
+    return temps, temps1
+
+
+def _read_window(ds, x, y, w, h):
+    """读取影像的一个窗口，返回HWC数组"""
+    arr = ds.ReadAsArray(x, y, w, h)
+    if arr.ndim == 3:
+        arr = arr.transpose((1, 2, 0))
+    return arr
+
+
+def _tile_core(start, length, size, margin):
+    """窗口中写入结果的部分，与相邻窗口的重叠区域各取一半，影像边缘处取到边缘"""
+    begin = margin if start > 0 else 0
+    end = length - margin if start + length < size else length
+    return begin, end
+
+
+def tiled_predict(predictor,
+                  path1,
+                  path2,
+                  out_path,
+                  block_size=256,
+                  overlap=128,
+                  batch_size=8):
+    """
+    分块流式推理，按窗口读取两期影像，逐批推理后将结果写入GeoTIFF，
+    峰值内存只与窗口大小和batch_size有关，与影像大小无关
+    :param predictor: 变化检测Predictor
+    :param path1: 第一时相影像路径
+    :param path2: 第二时相影像路径，大小需与第一时相相同
+    :param out_path: 结果GeoTIFF路径，变化区域为255，未变化区域为0
+    :param block_size: 滑窗大小
+    :param overlap: 相邻窗口的重叠像素数
+    :param batch_size: 每次推理的窗口数
+    """
+    ds1 = gdal.Open(path1)
+    ds2 = gdal.Open(path2)
+    w, h = ds1.RasterXSize, ds1.RasterYSize
+    if (ds2.RasterXSize, ds2.RasterYSize) != (w, h):
+        raise ValueError("两期影像的大小不一致")
+    out = gdal.GetDriverByName("GTiff").Create(
+        out_path, w, h, 1, gdal.GDT_Byte,
+        options=["TILED=YES", "COMPRESS=LZW"])
+    # 保留第一时相的地理参考
+    out.SetGeoTransform(ds1.GetGeoTransform())
+    out.SetProjection(ds1.GetProjection())
+    band = out.GetRasterBand(1)
+    block_h, block_w = min(block_size, h), min(block_size, w)
+    stride = block_size - overlap
+    margin = overlap // 2
+    windows = [(x, y) for y in window_starts(h, block_h, stride)
+               for x in window_starts(w, block_w, stride)]
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        tiles = [(_read_window(ds1, x, y, block_w, block_h),
+                  _read_window(ds2, x, y, block_w, block_h))
+                 for x, y in batch]
+        with metrics.timer("inference"):
+            preds = predictor.predict(tiles)
+        for (x, y), pred in zip(batch, preds):
+            label_map = np.argmax(pred['score_map'], axis=-1)
+            x0, x1 = _tile_core(x, block_w, w, margin)
+            y0, y1 = _tile_core(y, block_h, h, margin)
+            core = np.where(label_map[y0:y1, x0:x1] == 0, 0, 255)
+            band.WriteArray(core.astype(np.uint8), x + x0, y + y0)
+    band.FlushCache()
+    out = None
+    ds1 = ds2 = None
+
+
+def gdal_preview(path, save_dir, name, max_size=1024):
+    """
+    按降采样读取影像生成png预览图，用于页面展示和变化图分析
+    :param path: 影像路径
+    :param save_dir: 预览图保存路径
+    :param name: 原文件名，用于生成新的文件名
+    :param max_size: 预览图长边的像素数
+    :return: 预览图文件名
+    """
+    ds = gdal.Open(path)
+    w, h = ds.RasterXSize, ds.RasterYSize
+    scale = min(max_size / max(w, h), 1)
+    pw, ph = max(int(w * scale), 1), max(int(h * scale), 1)
+    bands = min(ds.RasterCount, 3)
+    img = np.stack([
+        ds.GetRasterBand(i + 1).ReadAsArray(
+            0, 0, w, h, buf_xsize=pw, buf_ysize=ph) for i in range(bands)
+    ], axis=-1)
+    ds = None
+    if img.dtype != np.uint8:
+        img = img.astype(np.float32)
+        img = (img - img.min()) / max(img.max() - img.min(), 1e-6) * 255
+        img = img.astype(np.uint8)
+    if bands == 3:
+        img = img[:, :, ::-1]  # RGB -> BGR
+    new_name = md5_name(osp.splitext(name)[0] + ".png")
+    cv2.imwrite(osp.join(save_dir, new_name), img)
+    return new_name
+
+
+def tiled_execute(model_path,
+                  data_path,
+                  out_dir,
+                  names,
+                  window_size=256,
+                  stride=128,
+                  progress=None):
+    """
+    大幅影像的分块变化检测
+    :param progress: 每完成一对影像的推理调用一次的回调
+    :return: 结果GeoTIFF的查看链接列表，结果预览图文件名列表
+    """
+    batch_size = current_app.config.get("INFERENCE_BATCH_SIZE", 8)
+    temps = list()  # 存储GeoTIFF的查看链接
+    temps1 = list()  # 存储结果预览图名
+    with predictor_cache.acquire(model_path, use_gpu=True) as predictor:
+        for name in names:
+            tif_name = md5_name(osp.splitext(name["first"])[0] + ".tif")
+            tif_path = osp.join(out_dir, tif_name)
+            tiled_predict(
+                predictor,
+                osp.join(data_path, name["first"]),
+                osp.join(data_path, name["second"]),
+                tif_path,
+                block_size=window_size,
+                overlap=window_size - stride,
+                batch_size=batch_size)
+            temps.append(generate_url + tif_name)
+            temps1.append(gdal_preview(tif_path, out_dir, tif_name))
+            if progress:
+                progress()
     return temps, temps1
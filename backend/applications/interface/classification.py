@@ -1,12 +1,23 @@
 import os.path as osp
 
-import paddlers as pdrs
+from flask import current_app
 from paddlers.transforms import decode_image
 
+from applications.common.utils.batch import chunked
+from applications.extensions import predictor_cache, metrics
 
-def execute(model_path, data_path, names):
-    image_list = [osp.join(data_path, name) for name in names]
-    ims = [decode_image(i) for i in image_list]
-    predictor = pdrs.deploy.Predictor(model_path, use_gpu=True)
-    temps = predictor.predict(ims)
+
+def execute(model_path, data_path, names, progress=None):
+    """
+    :param progress: 每完成一批推理调用一次的回调，参数为该批的图片数
+    """
+    batch_size = current_app.config.get("INFERENCE_BATCH_SIZE", 8)
+    temps = list()
+    with predictor_cache.acquire(model_path, use_gpu=True) as predictor:
+        for batch in chunked(names, batch_size):
+            ims = [decode_image(osp.join(data_path, name)) for name in batch]
+            with metrics.timer("inference"):
+                temps.extend(predictor.predict(ims))
+            if progress:
+                progress(len(batch))
     return temps
@@ -1,25 +1,31 @@
 import os.path as osp
 
+from flask import current_app
 from skimage.io import imsave
 
-import paddlers as pdrs
-
 from applications.common.path_global import generate_url
+from applications.common.utils.batch import chunked
+from applications.extensions import predictor_cache, metrics
 
 
-def execute(model_path, data_path, out_dir, names):
+def execute(model_path, data_path, out_dir, names, progress=None):
     """
         :param model_path: 模型路径
         :param data_path: 数据文件夹路径，里面只包含图片
         :param out_dir: 结果保存路径
         :param names: 待处理文件名列表
+        :param progress: 每完成一批推理与保存调用一次的回调，参数为该批的图片数
     """
+    batch_size = current_app.config.get("INFERENCE_BATCH_SIZE", 8)
     temps = list()
-    image_list = [osp.join(data_path, name) for name in names]
-    predictor = pdrs.deploy.Predictor(model_dir=model_path, use_gpu=True)
-    pred = predictor.predict(image_list)
-    imgs = [im['res_map'] for im in pred]
-    for name, im in zip(names, imgs):
-        imsave(osp.join(out_dir, name), im)
-        temps.append(generate_url + name)
+    with predictor_cache.acquire(model_path, use_gpu=True) as predictor:
+        for batch in chunked(names, batch_size):
+            image_list = [osp.join(data_path, name) for name in batch]
+            with metrics.timer("inference"):
+                pred = predictor.predict(image_list)
+            for name, im in zip(batch, pred):
+                imsave(osp.join(out_dir, name), im['res_map'])
+                temps.append(generate_url + name)
+            if progress:
+                progress(len(batch))
     return temps
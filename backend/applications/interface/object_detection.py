@@ -1,45 +1,60 @@
 # 导入需要用到的库
 import os.path as osp
+from functools import partial
 
 import paddle
 import numpy as np
 from skimage.io import imsave
+from flask import current_app
 from paddlers.models.ppdet.utils.colormap import colormap
 
-import paddlers as pdrs
 from paddlers.transforms import decode_image
 from paddlers.tasks.utils.visualize import visualize_detection
 
 from applications.common.path_global import md5_name, generate_url
+from applications.common.utils.batch import chunked
+from applications.extensions import predictor_cache, metrics, executor
 
 
-def execute(model_path, data_path, out_dir, names, threshold=0.2):
+def render_detection(out_dir, threshold, item):
+    """
+    绘制预测目标框并保存
+    :param item: (图像数组, 预测结果, 新图片名)
+    :return: 新图片名
+    """
+    vis, pred, new_name = item
+    if len(pred) > 0:
+        with paddle.no_grad():
+            vis = visualize_detection(
+                np.array(vis), pred, threshold=threshold, save_dir=None)
+    imsave(osp.join(out_dir, new_name), vis)
+    return new_name
+
+
+def execute(model_path, data_path, out_dir, names, threshold=0.2,
+            progress=None):
     """
     :param model_path: 模型路径
     :param data_path: 数据文件夹路径，里面只包含图片
     :param out_dir: 结果保存路径
     :param names: 待处理文件名列表
     :param threshold: 阈值
+    :param progress: 每完成一张图片的推理与绘制调用一次的回调
     """
-    image_list = [osp.join(data_path, name) for name in names]
-    predictor = pdrs.deploy.Predictor(model_dir=model_path, use_gpu=True)
-    pred = predictor.predict(image_list)
-    # 读取输入影像
-    ims = [decode_image(i) for i in image_list]
+    batch_size = current_app.config.get("INFERENCE_BATCH_SIZE", 8)
     temps = list()
-    # 绘制目标框
-    with paddle.no_grad():
-        for idx, im in zip(range(len(names)), ims):
-            vis = im
-            # 绘制预测目标框
-            if len(pred[idx]) > 0:
-                vis = visualize_detection(
-                    np.array(vis),
-                    pred[idx],
-                    threshold=threshold,
-                    save_dir=None)
-            name = names[idx]
-            new_name = md5_name(name)
-            imsave(osp.join(out_dir, new_name), vis)
-            temps.append(generate_url + new_name)
+    with predictor_cache.acquire(model_path, use_gpu=True) as predictor:
+        for batch in chunked(names, batch_size):
+            # 每张影像只解码一次，同时用于推理和绘制
+            ims = [decode_image(osp.join(data_path, name)) for name in batch]
+            with metrics.timer("inference"):
+                pred = predictor.predict(ims)
+            # 绘制目标框，每张图片的绘制与保存在共享的executor中并行执行
+            with metrics.timer("render"):
+                items = [(ims[idx], pred[idx], md5_name(name))
+                         for idx, name in enumerate(batch)]
+                temps.extend(
+                    generate_url + new_name for new_name in executor.map(
+                        partial(render_detection, out_dir, threshold), items,
+                        callback=progress))
     return temps
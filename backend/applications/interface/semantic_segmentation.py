@@ -1,25 +1,47 @@
 import os.path as osp
 from collections import Counter
+from functools import partial
 
 import cv2
 import numpy as np
-import paddlers as pdrs
+from flask import current_app
 from paddlers.tasks.utils.visualize import get_color_map_list
 from skimage.io import imsave
 
 from applications.common.path_global import md5_name, generate_url
+from applications.common.utils.batch import chunked
+from applications.extensions import predictor_cache, metrics, executor
 
 
-def execute(model_path, data_path, out_dir, test_names):
-    image_list = [osp.join(data_path, name) for name in test_names]
-    predictor = pdrs.deploy.Predictor(model_path, use_gpu=True)
-    pred = predictor.predict(image_list)
-    ims = [i['label_map'] for i in pred]
+def render_label(out_dir, lut, item):
+    """
+    按调色板为分类结果着色并保存
+    :param item: (label_map, 新图片名)
+    :return: 新图片名
+    """
+    im, new_name = item
+    imsave(osp.join(out_dir, new_name), np.uint8(lut[im]))
+    return new_name
+
+
+def execute(model_path, data_path, out_dir, test_names, progress=None):
+    """
+    :param progress: 每完成一张图片的推理与着色调用一次的回调
+    """
+    batch_size = current_app.config.get("INFERENCE_BATCH_SIZE", 8)
     temps = list()
     lut = np.array(get_color_map_list(256))
-    for idx, im in zip(range(len(image_list)), ims):
-        im = lut[im]
-        new_name = md5_name(test_names[idx])
-        imsave(osp.join(out_dir, new_name), np.uint8(im))
-        temps.append(generate_url + new_name)
+    with predictor_cache.acquire(model_path, use_gpu=True) as predictor:
+        for batch in chunked(test_names, batch_size):
+            image_list = [osp.join(data_path, name) for name in batch]
+            with metrics.timer("inference"):
+                pred = predictor.predict(image_list)
+            ims = [i['label_map'] for i in pred]
+            # 每张图片的着色与保存在共享的executor中并行执行
+            with metrics.timer("render"):
+                items = [(im, md5_name(name)) for im, name in zip(ims, batch)]
+                temps.extend(
+                    generate_url + new_name for new_name in executor.map(
+                        partial(render_label, out_dir, lut), items,
+                        callback=progress))
     return temps
@@ -5,6 +5,11 @@ from applications.extensions import db
 
 class Analysis(db.Model):
     __tablename__ = 'analysis'
+    __table_args__ = (
+        # 按功能类型和时间倒序分页
+        db.Index('ix_analysis_type_create_time_id', 'type', 'create_time',
+                 'id'),
+        db.Index('ix_analysis_create_time_id', 'create_time', 'id'), )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     type = db.Column(db.Integer)
     before_img = db.Column(db.String(512))
@@ -1,2 +1,2 @@
-from .analysis import AnalysisSchema
+from .analysis import AnalysisSchema, AnalysisSummarySchema
 from .photo import PhotoOutSchema
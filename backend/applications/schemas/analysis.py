@@ -12,3 +12,14 @@ class AnalysisSchema(ma.Schema):
     data = fields.Dict()
     is_hole = fields.Boolean()
     create_time = fields.DateTime()
+
+
+class AnalysisSummarySchema(ma.Schema):
+    """列表摘要，不包含结果数据data"""
+    id = fields.Integer()
+    type = fields.Integer()
+    before_img = fields.Str()
+    before_img1 = fields.Str()
+    after_img = fields.Str()
+    is_hole = fields.Boolean()
+    create_time = fields.DateTime()
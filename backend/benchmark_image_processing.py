@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cugrs 图像处理离线基准测试脚本
+
+使用 prepare_test_data.py 中的 RemoteSensingImageGenerator 生成不同尺寸的合成遥感图像，
+对预处理与后处理函数逐一计时，记录耗时、吞吐量(百万像素/秒)与 tracemalloc 统计的峰值内存，
+结果保存为 JSON 报告，并可与保存的基线进行比较。不需要模型和 GPU。
+
+使用方法:
+    python benchmark_image_processing.py
+    python benchmark_image_processing.py --sizes 512 1024 --repeat 5
+    python benchmark_image_processing.py --save-baseline
+    python benchmark_image_processing.py --baseline benchmark_baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from prepare_test_data import RemoteSensingImageGenerator
+from applications.image_processing import histogram_match
+from applications.image_processing.CLAHE import CLAHE
+from applications.image_processing.gaussian_blur import gaussian_blur
+from applications.image_processing.hole import hole_fill
+from applications.image_processing.median_blur import median_blur
+from applications.image_processing.render import batch_render
+from applications.image_processing.render_seg import batch_render_seg
+from applications.image_processing.resize import resize
+from applications.image_processing.sharpen import sharpen
+from applications.interface.compute_variation import compute_variation
+from applications.interface.draw_mask import draw_masks
+
+DEFAULT_SIZES = [512, 1024, 2048, 4096, 8192]
+# 生成器按512像素的场景绘制地物，更大的尺寸由该尺寸的图像放大得到，避免生成时占用过多内存
+MAX_GENERATE_SIZE = 2048
+
+
+def prepare_inputs(data_dir, size, seed=0):
+    """
+    生成一组测试输入
+    :return: 第一时相、第二时相、变化图、分割结果的文件名
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    gen_size = min(size, MAX_GENERATE_SIZE)
+    generator = RemoteSensingImageGenerator((gen_size, gen_size))
+    img1, img2 = generator.create_change_pair('urban')
+    im1 = cv2.cvtColor(np.array(img1), cv2.COLOR_RGB2BGR)
+    im2 = cv2.cvtColor(np.array(img2), cv2.COLOR_RGB2BGR)
+    if gen_size != size:
+        im1 = cv2.resize(im1, (size, size), interpolation=cv2.INTER_NEAREST)
+        im2 = cv2.resize(im2, (size, size), interpolation=cv2.INTER_NEAREST)
+    # 两期差异较大的区域作为变化图
+    diff = cv2.absdiff(im1, im2).max(axis=2)
+    change = np.where(diff > 60, 255, 0).astype(np.uint8)
+    # 按灰度分级模拟地物分类结果
+    label = (cv2.cvtColor(im1, cv2.COLOR_BGR2GRAY) // 64).astype(np.uint8)
+    names = {
+        "first": "first.png",
+        "second": "second.png",
+        "change": "change.png",
+        "label": "label.png"
+    }
+    cv2.imwrite(os.path.join(data_dir, names["first"]), im1)
+    cv2.imwrite(os.path.join(data_dir, names["second"]), im2)
+    cv2.imwrite(os.path.join(data_dir, names["change"]), change)
+    cv2.imwrite(os.path.join(data_dir, names["label"]), label)
+    return names
+
+
+def operations(data_dir, save_dir, names):
+    """待测函数，均以文件为输入，与接口中的调用方式一致"""
+    first = names["first"]
+    change = names["change"]
+    return {
+        "CLAHE": lambda: CLAHE(data_dir, save_dir, [first]),
+        "sharpen": lambda: sharpen(data_dir, save_dir, [first]),
+        "median_blur": lambda: median_blur(data_dir, save_dir, [first]),
+        "gaussian_blur": lambda: gaussian_blur(data_dir, save_dir, [first]),
+        "resize": lambda: resize(data_dir, save_dir, [first], mode=0),
+        "gram_match": lambda: histogram_match.gram_match(
+            [{"first": first, "second": names["second"]}], data_dir,
+            save_dir, False),
+        "hole_fill": lambda: hole_fill(data_dir, save_dir, [change]),
+        "draw_masks":
+        lambda: draw_masks(os.path.join(data_dir, change)),
+        "compute_variation":
+        lambda: compute_variation(os.path.join(data_dir, change)),
+        "batch_render": lambda: batch_render(data_dir, save_dir, [change], ""),
+        "batch_render_seg":
+        lambda: batch_render_seg(data_dir, save_dir, [names["label"]]),
+    }
+
+
+def measure(func, repeat):
+    """
+    :return: 各次耗时(秒)与tracemalloc统计的峰值内存(字节)
+    """
+    func()  # 预热，排除首次调用的初始化开销
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    # 峰值内存单独测量一次，避免tracemalloc的开销影响计时
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run_benchmark(sizes, repeat, only=None):
+    results = list()
+    for size in sizes:
+        print(f"\n📐 尺寸: {size}x{size}")
+        work_dir = tempfile.mkdtemp(prefix="cugrs_bench_")
+        try:
+            data_dir = os.path.join(work_dir, "data")
+            save_dir = os.path.join(work_dir, "res")
+            os.makedirs(data_dir)
+            os.makedirs(save_dir)
+            names = prepare_inputs(data_dir, size)
+            for name, func in operations(data_dir, save_dir, names).items():
+                if only and name not in only:
+                    continue
+                times, peak = measure(func, repeat)
+                median = statistics.median(times)
+                results.append({
+                    "operation": name,
+                    "size": size,
+                    "repeat": repeat,
+                    "median": median,
+                    "min": min(times),
+                    "max": max(times),
+                    "megapixels_per_second": size * size / 1e6 / median,
+                    "peak_memory": peak
+                })
+                print(f"   {name:<18} {median * 1000:>10.2f} ms"
+                      f" {size * size / 1e6 / median:>10.1f} MP/s"
+                      f" {peak / 1024 / 1024:>10.1f} MB")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__
+        },
+        "results": results
+    }
+
+
+def compare(report, baseline, tolerance):
+    """
+    与基线比较中位耗时
+    :param tolerance: 允许的耗时增长比例
+    :return: 变慢超过tolerance的项
+    """
+    base = {(r["operation"], r["size"]): r for r in baseline["results"]}
+    regressions = list()
+    print(f"\n📊 与基线比较 (容差 {tolerance:.0%})")
+    for r in report["results"]:
+        b = base.get((r["operation"], r["size"]))
+        if b is None:
+            continue
+        ratio = r["median"] / b["median"]
+        mem_ratio = r["peak_memory"] / max(b["peak_memory"], 1)
+        regressed = ratio > 1 + tolerance
+        mark = "⚠️ " if regressed else "✅"
+        print(f"   {mark} {r['operation']:<18} {r['size']:>5}"
+              f"  耗时 x{ratio:.2f}  内存 x{mem_ratio:.2f}")
+        r["baseline_ratio"] = ratio
+        r["baseline_memory_ratio"] = mem_ratio
+        if regressed:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='cugrs 图像处理基准测试')
+    parser.add_argument('--sizes', '-s', nargs='+', type=int,
+                        default=DEFAULT_SIZES,
+                        help='图像边长 (默认: 512 1024 2048 4096 8192)')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='每项计时次数 (默认: 3)')
+    parser.add_argument('--only', nargs='+', default=None,
+                        help='只测试指定的函数')
+    parser.add_argument('--output', '-o', default='benchmark_report.json',
+                        help='报告输出路径 (默认: benchmark_report.json)')
+    parser.add_argument('--baseline', '-b', default='benchmark_baseline.json',
+                        help='基线文件路径 (默认: benchmark_baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', '-t', type=float, default=0.2,
+                        help='允许的耗时增长比例，超过时返回非0 (默认: 0.2)')
+
+    args = parser.parse_args()
+
+    print("⏱️  cugrs 图像处理基准测试")
+    print("=" * 40)
+
+    report = run_benchmark(args.sizes, args.repeat, args.only)
+
+    regressions = list()
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 报告已保存: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 基线已保存: {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} 项比基线慢 {args.tolerance:.0%} 以上")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -8,7 +8,9 @@ CREATE TABLE `analysis` (
   `is_hole` tinyint(1) DEFAULT NULL COMMENT '是否开启过孔洞',
   `checked` varchar(32) DEFAULT NULL COMMENT '勾选过那些功能,隔开',
   `create_time` datetime DEFAULT NULL COMMENT '分析时间',
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `ix_analysis_type_create_time_id` (`type`, `create_time`, `id`),
+  KEY `ix_analysis_create_time_id` (`create_time`, `id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8 COLLATE=utf8_general_ci COMMENT='图像分析记录表';
 CREATE TABLE `photo` (
   `id` bigint(20) NOT NULL AUTO_INCREMENT,
@@ -17,6 +19,8 @@ CREATE TABLE `photo` (
   `href` varchar(255) DEFAULT NULL COMMENT '图片链接',
   `mime` char(50) NOT NULL COMMENT '图片类型',
   `size` char(30) NOT NULL COMMENT '图片大小',
+  `hash` char(64) DEFAULT NULL COMMENT '文件内容sha256',
   `create_time` datetime DEFAULT NULL COMMENT '上传时间',
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  KEY `ix_photo_hash` (`hash`)
 ) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8 COLLATE=utf8_general_ci COMMENT='上传图片记录表';
\ No newline at end of file
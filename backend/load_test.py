@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cugrs 后端压力测试脚本
+
+在进程内以 testing 配置启动应用(sqlite 临时文件数据库)，使用输出格式与 PaddleRS 一致的
+确定性桩 Predictor 代替真实模型，并发请求全部 /api/analysis/* 接口，
+统计各接口的 p50/p95/p99 延迟与每秒请求数。不需要 GPU、MySQL 和模型文件，
+用于衡量接口与处理流程本身的开销，以及发现性能回退。
+
+使用方法:
+    python load_test.py
+    python load_test.py --concurrency 16 --requests 400 --size 512
+    python load_test.py --infer-ms 20 --output load_report.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import yaml
+
+# 各功能目录下桩模型的model.yml中的模型类型
+STUB_MODELS = {
+    "change_detection": "change_detector",
+    "classification": "classifier",
+    "image_restoration": "restorer",
+    "object_detection": "detector",
+    "semantic_segmentation": "segmenter"
+}
+LABEL_NAMES = ["farmland", "forest", "residential", "river", "road"]
+
+
+def _load(image):
+    if isinstance(image, str):
+        return cv2.cvtColor(cv2.imread(image), cv2.COLOR_BGR2RGB)
+    return image
+
+
+class StubPredictor:
+    """
+    与paddlers.deploy.Predictor输出格式相同的确定性预测器，结果只由输入图像决定
+    """
+
+    def __init__(self, model_dir, infer_ms=0, **options):
+        with open(os.path.join(model_dir, "model.yml")) as f:
+            self.model_type = yaml.load(
+                f.read(), Loader=yaml.Loader)["_Attributes"]["model_type"]
+        self.infer_ms = infer_ms
+
+    def predict(self, img_file, **kwargs):
+        images = img_file if isinstance(img_file, list) else [img_file]
+        if self.infer_ms:
+            # 模拟推理耗时，按图片数线性增长
+            time.sleep(self.infer_ms / 1000 * len(images))
+        func = getattr(self, "_" + self.model_type)
+        results = [func(image) for image in images]
+        return results if isinstance(img_file, list) else results[0]
+
+    def _change_detector(self, pair):
+        im1, im2 = (_load(im).astype(np.float32) for im in pair)
+        prob = np.abs(im1 - im2).mean(axis=2) / 255
+        score_map = np.stack([1 - prob, prob], axis=-1)
+        return {
+            "label_map": (prob > 0.25).astype(np.int64),
+            "score_map": score_map
+        }
+
+    def _segmenter(self, image):
+        gray = cv2.cvtColor(_load(image), cv2.COLOR_RGB2GRAY)
+        label_map = (gray // 64).astype(np.int64)
+        score_map = np.eye(4, dtype=np.float32)[label_map]
+        return {"label_map": label_map, "score_map": score_map}
+
+    def _detector(self, image):
+        h, w = _load(image).shape[:2]
+        return [{
+            "category_id": i,
+            "category": LABEL_NAMES[i],
+            "bbox": [w * i / 8, h * i / 8, w / 8, h / 8],
+            "score": 0.9 - i * 0.1
+        } for i in range(3)]
+
+    def _classifier(self, image):
+        mean = float(_load(image).mean())
+        scores = np.linspace(1, 2, len(LABEL_NAMES)) * (1 + mean / 255)
+        scores = (scores / scores.sum()).tolist()
+        order = sorted(range(len(scores)), key=lambda i: -scores[i])
+        return {
+            "class_ids_map": order,
+            "scores_map": [scores[i] for i in order],
+            "label_names_map": [LABEL_NAMES[i] for i in order]
+        }
+
+    def _restorer(self, image):
+        return {"res_map": cv2.GaussianBlur(_load(image), (3, 3), 0)}
+
+
+def prepare_workdir(work_dir, size, count, seed=0):
+    """
+    在工作目录下生成上传图片、结果目录与桩模型目录
+    :return: 上传图片链接列表与各功能的模型路径
+    """
+    from prepare_test_data import RemoteSensingImageGenerator
+
+    random.seed(seed)
+    np.random.seed(seed)
+    for sub in ("static/upload/res/hole", "static/upload/res/cache"):
+        os.makedirs(os.path.join(work_dir, sub), exist_ok=True)
+    models = dict()
+    for name, model_type in STUB_MODELS.items():
+        model_dir = os.path.join(work_dir, "model", name, "stub")
+        os.makedirs(model_dir)
+        with open(os.path.join(model_dir, "model.yml"), "w") as f:
+            yaml.dump({
+                "Model": "Stub",
+                "_Attributes": {
+                    "model_type": model_type
+                }
+            }, f)
+        models[name] = "model/{}/stub".format(name)
+    generator = RemoteSensingImageGenerator((size, size))
+    urls = list()
+    scenes = ["urban", "vegetation", "mixed"]
+    for i in range(count):
+        img1, img2 = generator.create_change_pair(scenes[i % len(scenes)])
+        for j, img in enumerate((img1, img2)):
+            name = "load_{}_{}.png".format(i, j)
+            img.save(os.path.join(work_dir, "static/upload", name))
+            urls.append("/_uploads/photos/" + name)
+    return urls, models
+
+
+def workloads(urls, models):
+    """
+    各接口的请求构造函数，返回(方法, 地址, json)
+    """
+
+    def pair():
+        i = random.randrange(len(urls) // 2)
+        return {"first": urls[2 * i], "second": urls[2 * i + 1]}
+
+    def some(n=2):
+        return random.sample(urls, n)
+
+    return {
+        "change_detection": lambda: ("POST", "/api/analysis/change_detection", {
+            "model_path": models["change_detection"],
+            "list": [pair()],
+            "prehandle": random.choice([0, 1, 4]),
+            "denoise": random.choice([0, 3, 5]),
+            "wait": True
+        }),
+        "object_detection": lambda: ("POST", "/api/analysis/object_detection", {
+            "model_path": models["object_detection"],
+            "list": some(),
+            "prehandle": random.choice([0, 2, 4]),
+            "denoise": random.choice([0, 3, 5]),
+            "wait": True
+        }),
+        "semantic_segmentation":
+        lambda: ("POST", "/api/analysis/semantic_segmentation", {
+            "model_path": models["semantic_segmentation"],
+            "list": some(),
+            "prehandle": random.choice([0, 2, 4]),
+            "denoise": random.choice([0, 3, 5]),
+            "wait": True
+        }),
+        "classification": lambda: ("POST", "/api/analysis/classification", {
+            "model_path": models["classification"],
+            "list": some(),
+            "wait": True
+        }),
+        "image_restoration":
+        lambda: ("POST", "/api/analysis/image_restoration", {
+            "model_path": models["image_restoration"],
+            "list": some(1),
+            "wait": True
+        }),
+        "histogram_match": lambda: ("POST", "/api/analysis/histogram_match", {
+            "list": [pair()],
+            "prehandle": random.choice([1, 4])
+        }),
+        "image_pre": lambda: ("POST", "/api/analysis/image_pre", {
+            "list": some(),
+            "prehandle": random.choice([2, 4]),
+            "type": 2
+        }),
+        "show": lambda: ("GET", "/api/analysis/show/{}?page=1&limit=10".format(
+            random.choice(["变化检测", "目标检测", "地物分类"])), None),
+    }
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    return values[f] + (values[c] - values[f]) * (k - f)
+
+
+def wait_job(client, job_id, interval=0.05):
+    """
+    等待超过JOB_WAIT_TIMEOUT时接口返回202，轮询任务状态直到任务结束
+    :return: 任务是否成功
+    """
+    while True:
+        job = client.get("/api/analysis/job/" + job_id).get_json()["data"]
+        if job["status"] in ("success", "failed"):
+            return job["status"] == "success"
+        time.sleep(interval)
+
+
+def run_load(app, loads, total, concurrency, warmup):
+    """
+    :return: 接口名称 -> [(耗时, 是否成功)]与总耗时
+    """
+    samples = {name: list() for name in loads}
+    lock = threading.Lock()
+    local = threading.local()
+    names = list(loads)
+
+    def one(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        name = names[i % len(names)]
+        method, url, body = loads[name]()
+        start = time.perf_counter()
+        res = client.open(url, method=method, json=body)
+        if res.status_code == 202:
+            ok = wait_job(client, res.get_json()["data"]["job_id"])
+        else:
+            ok = res.status_code == 200 and res.get_json().get(
+                "success", False)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            with lock:
+                samples[name].append((elapsed, ok))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # 预热，加载桩模型、建立数据库连接
+        list(pool.map(one, range(warmup)))
+        start = time.perf_counter()
+        list(pool.map(one, range(warmup, warmup + total)))
+        duration = time.perf_counter() - start
+    return samples, duration
+
+
+def summarize(samples, duration):
+    report = dict()
+    print(f"\n{'接口':<24}{'请求':>6}{'失败':>6}{'p50(ms)':>10}{'p95(ms)':>10}"
+          f"{'p99(ms)':>10}{'RPS':>8}")
+    for name, items in samples.items():
+        if not items:
+            continue
+        times = [t for t, _ in items]
+        failed = sum(1 for _, ok in items if not ok)
+        row = {
+            "requests": len(items),
+            "failed": failed,
+            "p50": percentile(times, 50),
+            "p95": percentile(times, 95),
+            "p99": percentile(times, 99),
+            "rps": len(items) / duration
+        }
+        report[name] = row
+        print(f"{name:<24}{row['requests']:>6}{failed:>6}"
+              f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}"
+              f"{row['p99'] * 1000:>10.1f}{row['rps']:>8.2f}")
+    total = sum(row["requests"] for row in report.values())
+    print(f"\n总计 {total} 个请求，耗时 {duration:.2f}s，"
+          f"{total / duration:.2f} 请求/秒")
+    return {"duration": duration, "rps": total / duration, "endpoints": report}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='cugrs 后端压力测试')
+    parser.add_argument('--concurrency', '-c', type=int, default=8,
+                        help='并发请求数 (默认: 8)')
+    parser.add_argument('--requests', '-n', type=int, default=200,
+                        help='请求总数，按接口轮流分配 (默认: 200)')
+    parser.add_argument('--warmup', type=int, default=16,
+                        help='不计入统计的预热请求数 (默认: 16)')
+    parser.add_argument('--size', '-s', type=int, default=512,
+                        help='测试图像边长 (默认: 512)')
+    parser.add_argument('--images', type=int, default=6,
+                        help='生成的图像对数 (默认: 6)')
+    parser.add_argument('--infer-ms', type=float, default=0,
+                        help='桩模型每张图片的模拟推理耗时(毫秒) (默认: 0)')
+    parser.add_argument('--job-workers', type=int, default=2,
+                        help='任务队列工作线程数 (默认: 2)')
+    parser.add_argument('--endpoints', nargs='+', default=None,
+                        help='只测试指定的接口')
+    parser.add_argument('--output', '-o', default=None,
+                        help='JSON报告输出路径')
+    parser.add_argument('--keep', action='store_true',
+                        help='保留临时工作目录')
+
+    args = parser.parse_args()
+
+    print("🚦 cugrs 后端压力测试")
+    print("=" * 40)
+
+    work_dir = tempfile.mkdtemp(prefix="cugrs_load_")
+    cwd = os.getcwd()
+    try:
+        urls, models = prepare_workdir(work_dir, args.size, args.images)
+        # 应用使用相对路径读写上传目录与模型目录，需在工作目录中启动
+        os.chdir(work_dir)
+        os.environ["TEST_DATABASE_URI"] = "sqlite:///" + os.path.join(
+            work_dir, "load_test.db")
+        os.environ["JOB_WORKERS"] = str(args.job_workers)
+        from applications import create_app
+        from applications.extensions import predictor_cache
+
+        app = create_app('testing')
+        predictor_cache.configure(
+            loader=lambda model_dir, **options: StubPredictor(
+                model_dir, infer_ms=args.infer_ms, **options))
+
+        loads = workloads(urls, models)
+        if args.endpoints:
+            loads = {k: v for k, v in loads.items() if k in args.endpoints}
+        print(f"并发 {args.concurrency}，请求 {args.requests}，"
+              f"图像 {args.size}x{args.size}，接口 {len(loads)} 个")
+        samples, duration = run_load(app, loads, args.requests,
+                                     args.concurrency, args.warmup)
+        report = summarize(samples, duration)
+        report["config"] = vars(args)
+        if args.output:
+            with open(os.path.join(cwd, args.output), 'w') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"\n💾 报告已保存: {args.output}")
+        failed = sum(row["failed"] for row in report["endpoints"].values())
+        return 1 if failed else 0
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"工作目录: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    exit(main())
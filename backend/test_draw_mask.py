@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from applications.interface.draw_mask import draw_masks
+
+
+def draw_masks_reference(img_path):
+    """逐像素设置透明度的原始实现，用于校验向量化实现"""
+    img = cv2.imread(img_path)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    ret, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_TREE,
+                                           cv2.CHAIN_APPROX_SIMPLE)
+    count = len(contours)
+    img = np.ones((img.shape[0], img.shape[1], 4)) * (255, 255, 255, 0)
+    img = cv2.drawContours(img, contours, -1, (0, 255, 0), 3)
+    b = img[:, :, 0]
+    g = img[:, :, 1]
+    r = img[:, :, 2]
+    a = img[:, :, 3]
+    for i in range(img.shape[0]):
+        for j in range(img.shape[1]):
+            if not (b[i][j] > 0 and g[i][j] > 0 and r[i][j] > 0):
+                a[i][j] = 255
+    mask = cv2.merge((b, g, r, a))
+    return mask, count
+
+
+class DrawMaskTest(unittest.TestCase):
+    """变化区域轮廓掩膜测试"""
+
+    def setUp(self):
+        change_map = np.zeros((96, 128), dtype=np.uint8)
+        cv2.rectangle(change_map, (10, 10), (40, 50), 255, -1)
+        cv2.circle(change_map, (90, 60), 20, 255, -1)
+        cv2.circle(change_map, (90, 60), 6, 0, -1)
+        change_map[80:, 0:5] = 255
+        fd, self.path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        cv2.imwrite(self.path, cv2.merge([change_map] * 3))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_matches_reference(self):
+        mask, count = draw_masks(self.path)
+        expected, expected_count = draw_masks_reference(self.path)
+        self.assertEqual(mask.dtype, np.uint8)
+        self.assertEqual(mask.shape, (96, 128, 4))
+        self.assertEqual(count, expected_count)
+        np.testing.assert_array_equal(mask, expected.astype(np.uint8))
+
+    def test_empty_change_map(self):
+        cv2.imwrite(self.path, np.zeros((16, 16, 3), dtype=np.uint8))
+        mask, count = draw_masks(self.path)
+        self.assertEqual(count, 0)
+        self.assertTrue((mask == (255, 255, 255, 0)).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from applications.image_processing.histogram_match import match_image
+
+
+def match_image_reference(img, ref):
+    """逐灰度级实现的直方图匹配，用于校验向量化实现"""
+    out = np.zeros_like(img)
+    for i in range(img.shape[2]):
+        hist_img, _ = np.histogram(img[:, :, i], 256)
+        hist_ref, _ = np.histogram(ref[:, :, i], 256)
+        cdf_img = np.cumsum(hist_img)
+        cdf_ref = np.cumsum(hist_ref)
+        for j in range(256):
+            tmp = abs(cdf_img[j] - cdf_ref).tolist()
+            out[:, :, i][img[:, :, i] == j] = tmp.index(min(tmp))
+    return out
+
+
+class HistogramMatchTest(unittest.TestCase):
+    """直方图匹配测试"""
+
+    def test_matches_reference(self):
+        rng = np.random.RandomState(0)
+        img = rng.randint(0, 256, (64, 80, 3)).astype(np.uint8)
+        ref = np.clip(rng.normal(90, 30, (64, 80, 3)), 0, 255).astype(np.uint8)
+        np.testing.assert_array_equal(
+            match_image(img, ref), match_image_reference(img, ref))
+
+    def test_narrow_range(self):
+        # 灰度范围不满0~255时np.histogram按实际范围分箱，结果需保持一致
+        rng = np.random.RandomState(1)
+        img = rng.randint(40, 120, (32, 32, 3)).astype(np.uint8)
+        ref = rng.randint(100, 200, (32, 32, 3)).astype(np.uint8)
+        np.testing.assert_array_equal(
+            match_image(img, ref), match_image_reference(img, ref))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from applications import create_app
+from applications.extensions import jobs, predictor_cache, executor, profiler
+from applications.interface.analysis import terrain_classification
+
+
+class LabelPredictor:
+    """返回全零分类结果的桩预测器"""
+
+    def predict(self, img_file):
+        return [{
+            "label_map": np.zeros((8, 8), dtype=np.int64)
+        } for _ in img_file]
+
+
+class JobProfileTest(unittest.TestCase):
+    """任务性能分析测试"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.work_dir, "upload")
+        self.out_dir = os.path.join(self.work_dir, "res") + "/"
+        os.makedirs(self.data_dir)
+        os.makedirs(self.out_dir)
+        self.app = create_app("testing")
+        predictor_cache.configure(loader=lambda *args, **kwargs: LabelPredictor())
+        profiler.configure(directory=os.path.join(self.work_dir, "profile"))
+        # 多个工作线程，未开启性能分析时渲染会在线程池中执行
+        executor.configure(workers=2)
+
+    def tearDown(self):
+        predictor_cache.invalidate()
+        profiler.configure(directory=self.app.config.get("PROFILE_DIR"))
+        executor.configure(workers=self.app.config.get("EXECUTOR_WORKERS"))
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_render_in_profile(self):
+        names = list()
+        for i in range(4):
+            name = "img_{}.png".format(i)
+            cv2.imwrite(
+                os.path.join(self.data_dir, name),
+                np.full((16, 16, 3), i * 40, dtype=np.uint8))
+            names.append("/_uploads/photos/" + name)
+        job = jobs.submit(
+            "semantic_segmentation",
+            terrain_classification,
+            os.path.join(self.work_dir, "model"),
+            self.data_dir,
+            self.out_dir,
+            names,
+            0,
+            0,
+            3,
+            total=len(names),
+            profile=True)
+        job.wait(30)
+        self.assertEqual(job.status, job.SUCCESS, job.error)
+        stats = pstats.Stats(profiler.path(job.id, "stats"))
+        functions = {func for _, _, func in stats.stats}
+        self.assertIn("render_label", functions)
+        self.assertIn("preprocess_image", functions)
+        self.assertTrue(os.path.isfile(profiler.path(job.id, "collapsed")))
+
+
+if __name__ == '__main__':
+    unittest.main()
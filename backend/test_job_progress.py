@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+from applications import create_app
+from applications.extensions import jobs, predictor_cache, executor
+from applications.interface.analysis import terrain_classification, PROGRESS_STAGES
+
+
+class ProgressPredictor:
+    """在每次推理时记录所属任务进度的桩预测器"""
+
+    def __init__(self):
+        self.job = None
+        self.ready = threading.Event()
+        self.seen = list()
+
+    def predict(self, img_file):
+        self.ready.wait(5)
+        self.seen.append(self.job.progress)
+        return [{
+            "label_map": np.zeros((8, 8), dtype=np.int64)
+        } for _ in img_file]
+
+
+class JobProgressTest(unittest.TestCase):
+    """任务进度测试"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.work_dir, "upload")
+        self.out_dir = os.path.join(self.work_dir, "res") + "/"
+        os.makedirs(self.data_dir)
+        os.makedirs(self.out_dir)
+        self.app = create_app("testing")
+        self.app.config["INFERENCE_BATCH_SIZE"] = 1
+        self.predictor = ProgressPredictor()
+        predictor_cache.configure(loader=lambda *args, **kwargs: self.predictor)
+        executor.configure(workers=1)
+
+    def tearDown(self):
+        predictor_cache.invalidate()
+        executor.configure(workers=self.app.config.get("EXECUTOR_WORKERS"))
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_progress_advances_per_stage(self):
+        names = list()
+        for i in range(3):
+            name = "img_{}.png".format(i)
+            cv2.imwrite(
+                os.path.join(self.data_dir, name),
+                np.full((16, 16, 3), i * 40, dtype=np.uint8))
+            names.append("/_uploads/photos/" + name)
+        stages = PROGRESS_STAGES[terrain_classification]
+        job = jobs.submit(
+            "semantic_segmentation",
+            terrain_classification,
+            os.path.join(self.work_dir, "model"),
+            self.data_dir,
+            self.out_dir,
+            names,
+            0,
+            0,
+            3,
+            total=len(names) * stages)
+        self.predictor.job = job
+        self.predictor.ready.set()
+        job.wait(30)
+        self.assertEqual(job.status, job.SUCCESS, job.error)
+        # 推理开始前已完成全部预处理，之后每绘制完一张图片前进一步
+        total = len(names) * stages
+        self.assertEqual(self.predictor.seen, [3 / total, 4 / total, 5 / total])
+        self.assertEqual(job.done, total)
+        self.assertEqual(job.to_dict()["progress"], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
 import { requestfile } from "@/api/requestfile.js"
 import {request} from "@/api/request.js"
+import {hideFullScreenLoading, setLoadingText, showFullScreenLoading} from '@/utils/loading'
+import {ElMessage} from "element-plus";
+
+// 轮询任务状态的间隔(毫秒)
+const JOB_POLL_INTERVAL = 1000
+
 export function createSrc(formdata) {
     return requestfile({
         method: 'POST',
@@ -14,12 +20,43 @@ export function createSrc(formdata) {
         }
     })
 }
+export function getJob(jobId){
+    return request({
+        method:'GET',
+        url:`/api/analysis/job/${jobId}`
+    })
+}
+
+function waitJob(jobId){
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            getJob(jobId).then((res) => {
+                const job = res.data.data
+                if (job.status === 'success') {
+                    resolve(res)
+                } else if (job.status === 'failed') {
+                    ElMessage.error(`后端出现异常：${job.error}`)
+                    reject()
+                } else {
+                    setLoadingText(`分析中 ${Math.round(job.progress * 100)}%`)
+                    setTimeout(poll, JOB_POLL_INTERVAL)
+                }
+            }).catch(reject)
+        }
+        poll()
+    })
+}
+
 export function imgUpload(data,funUrl){
+    // 分析接口异步执行，提交后轮询任务状态，任务结束后再返回
+    // 轮询期间保持loading框，避免每次轮询请求结束时关闭
+    showFullScreenLoading()
     return request({
         method:'POST',
         url:`/api/analysis/${funUrl}`,
         data
-    })
+    }).then((res) => waitJob(res.data.data.job_id))
+        .finally(hideFullScreenLoading)
 }
 
 export function histogramUpload(data){
@@ -29,7 +29,15 @@ export function hideFullScreenLoading () {
   }
 }
 
+// 更新loading框的文字，用于显示任务进度
+export function setLoadingText (text) {
+  if (needLoadingRequestCount > 0 && loading) {
+    loading.setText(`努力${text}...`)
+  }
+}
+
 export default {
   showFullScreenLoading,
   hideFullScreenLoading,
+  setLoadingText,
 }